@@ -1,28 +1,25 @@
 import pygame
 import numpy as np
-from scipy.interpolate import interp1d
 from math import sin, radians, degrees, copysign
 from pygame.math import Vector2
-from app.utils.math import check_intersection
+from app.utils.math import cast_rays, intersect_segments, rotation_matrix
 from app.modules.input_manager import InputManager
 from app.modules.graphics.rect import Rect
-from app.modules.graphics.ray import Ray
 from app.modules.neural_network import NeuralNetwork
 
 
 class Car:
-    def __init__(self, x, y, game=None, color=(255, 0, 0), track=None, angle=0.0, length=4, max_steering=np.pi / 2, max_acceleration=5.0, manual=False):
+    def __init__(self, x, y, color=(255, 0, 0), track=None, angle=0.0, length=4, max_steering=np.pi / 2, max_acceleration=5.0, manual=False, rng=None, check_points_multiplyer=5, distance_multiplyer=1):
         self.time = 0
 
-        self.game = game
-
         self.color = color
 
         self.neural_network = NeuralNetwork(
             inputs=7,
             outputs=2,
             hidden_layers=2,
-            hidden_neurons=7
+            hidden_neurons=7,
+            rng=rng
         )
 
         self.manual = manual
@@ -45,6 +42,18 @@ class Car:
 
         self.ray_length = 10
 
+        head_light_angle = np.arctan((self.width / 2) / (self.height / 2))
+
+        self.rays_angles = np.array([
+            0,
+            head_light_angle,
+            -head_light_angle,
+            np.pi / 2,
+            -np.pi / 2,
+            np.pi + head_light_angle,
+            np.pi + -head_light_angle,
+        ])
+
         self.brake_deceleration = 10
         self.free_deceleration = 2
 
@@ -55,32 +64,83 @@ class Car:
 
         self.check_point_index = 0
         self.last_check_point_updated_time = 0
-        self.last_position = Vector2(x, y)
-        self.traveled_distance = 0
         self.timeout = 5
 
+        # distance traveled along the track centerline, scored the same
+        # way as Fleet
+        self.traveled_distance = 0
+        self.track_progress = None
+
         self.fitness = 0
+        self.alive = True
+
+        # fitness multiplyers
+        self.check_points_multiplyer = check_points_multiplyer
+        self.distance_multiplyer = distance_multiplyer
+
+        # rotations of the car and of the front wheels, computed once per
+        # update and shared by every placed vertex
+        self.rotation = rotation_matrix(angle)
+        self.steering_rotation = rotation_matrix(0)
+        self.origin = np.array([x, y], dtype=float)
+
+        # Graphics, placed from their local vertices into the same buffers
+        # every update and only drawn when a viewer is attached
+        self.body = Rect(
+            -self.height / 2, -self.width / 2,
+            self.height, self.width,
+            color=self.color
+        )
+        self.wheels = []
+
+        # rear wheels
+        for side in [1, -1]:
+            self.wheels.append(
+                Rect(
+                    -self.height / 2,
+                    side * self.width / 2 - self.wheel_width / 2,
+                    self.wheel_radius * 2,
+                    self.wheel_width,
+                    color=(0, 255, 0)
+                )
+            )
+
+        # front wheels, steered around their center
+        for side in [1, -1]:
+            self.wheels.append(
+                Rect(
+                    -self.wheel_radius,
+                    -self.wheel_width / 2,
+                    self.wheel_radius * 2,
+                    self.wheel_width,
+                    color=(0, 255, 0)
+                )
+            )
+
+        self.front_wheels_offsets = [
+            np.array([self.height / 2, side * self.width / 2]) for side in [1, -1]
+        ]
+
+        # rays of the sensors in the car frame, one row per ray
+        self.local_rays = np.stack(
+            [np.cos(self.rays_angles), -np.sin(self.rays_angles)],
+            axis=-1
+        ) * self.ray_length
+        self.rays_directions = np.zeros_like(self.local_rays)
+        self.rays = np.zeros((len(self.rays_angles), 2, 2))
+        self.distances = np.full(len(self.rays_angles), np.inf)
+
+        self.placed = False
 
         # Input Manager
         self.inputs = InputManager()
 
     def _kill(self):
-        self.game.remove(self)
+        self.alive = False
 
     def _get_segments(self, vertices):
-        segments = []
-
-        for i in range(len(vertices)):
-            vertex = vertices[i]
-            next_vertex = vertices[i +
-                                   1] if len(vertices) - 1 != i else vertices[0]
-
-            segments.append((
-                Vector2(*vertex),
-                Vector2(*next_vertex)
-            ))
-
-        return segments
+        # (K, 2) polygon to its (K, 4) closed edges
+        return np.concatenate([vertices, np.roll(vertices, -1, axis=0)], axis=1)
 
     def _do_physics(self, delta_time, steering, acceleration):
         # handle steering
@@ -126,10 +186,9 @@ class Car:
                 self.max_acceleration
             )
         else:
-            acc = interp1d([-1, 1], [0, 1])
-
             self.steering = steering * self.max_steering
-            self.acceleration = acc(acceleration) * self.max_acceleration
+            # maps the [-1, 1] output to [0, 1]
+            self.acceleration = (acceleration + 1) / 2 * self.max_acceleration
 
         # integrate the position
         self.velocity.x += self.acceleration * delta_time
@@ -154,116 +213,84 @@ class Car:
         if np.abs(self.time - self.last_check_point_updated_time) > self.timeout:
             self._kill()
 
-        for car_segment in car_segments:
-            intersection_point = check_intersection(
-                car_segment,
-                self.track.check_points[self.check_point_index]
-            )
+        intersections = intersect_segments(
+            car_segments,
+            self.track.check_points_segments[self.check_point_index]
+        )
 
-            if len(intersection_point) > 0:
-                if self.check_point_index != len(self.track.check_points) - 1:
-                    self.check_point_index += 1
-                else:
-                    # The car basically finished the whole course
-                    print('end')
-                    pass
+        if np.isfinite(intersections).any():
+            if self.check_point_index != len(self.track.check_points_segments) - 1:
+                self.check_point_index += 1
+            else:
+                # The car basically finished the whole course
+                print('end')
+                pass
 
-                self.last_check_point_updated_time = self.time
+            self.last_check_point_updated_time = self.time
 
     def _check_wall_collisions(self, car_vertices):
         car_segments = self._get_segments(car_vertices)
 
         # Check the segments against the track for any intersection
-        for car_segment in car_segments:
-            for track_segment in self.track.line_segments:
-                intersection_point = check_intersection(
-                    car_segment,
-                    track_segment
-                )
-
-                if len(intersection_point) > 0:
-                    self._kill()
-
-    def _shoot_rays(self, screen, scale):
-        head_light_angle = np.arctan((self.width / 2) / (self.height / 2))
+        intersections = intersect_segments(
+            car_segments[:, np.newaxis],
+            self.track.segments
+        )
 
-        rays_angles = [
-            0,
-            head_light_angle,
-            -head_light_angle,
-            np.pi / 2,
-            -np.pi / 2,
-            np.pi + head_light_angle,
-            np.pi + -head_light_angle,
-        ]
+        if np.isfinite(intersections).any():
+            self._kill()
 
-        intersection_points_per_rays = [[]
-                                        for i in range(len(rays_angles))]
-        distances = np.array(
-            [np.inf for i in range(len(rays_angles))])
+    def _shoot_rays(self, scale):
+        origins = self.rays[:, 0]
 
-        for i, ray_angle in enumerate(rays_angles):
-            ray = Ray(
-                0, 0,
-                self.ray_length
-            )
+        np.multiply(self.origin, scale, out=origins)
+        np.matmul(self.local_rays, self.rotation, out=self.rays_directions)
+        self.rays_directions *= scale
+        np.add(origins, self.rays_directions, out=self.rays[:, 1])
 
-            ray.rotate(self.angle + ray_angle)
-            ray.translate(self.position.x, self.position.y)
-            ray.render(screen, scale)
-
-            # check for intersections
-            for segment in self.track.line_segments:
-                intersection_point = check_intersection(
-                    segment,
-                    (
-                        Vector2(*ray.vertices[0]),
-                        Vector2(*ray.vertices[1])
-                    )
-                )
+        hits_distances = cast_rays(
+            origins, self.rays_directions, self.track.segments)
 
-                if len(intersection_point) > 0:
-                    intersection_points_per_rays[i].append(intersection_point)
+        # to normalize the distances to [0, 1]
+        self.distances = hits_distances / (self.ray_length * scale)
 
-        for i, intersection_points in enumerate(intersection_points_per_rays):
-            if len(intersection_points) == 0:
-                continue
+        return self.distances
 
-            points_distances = list(map(
-                lambda point: np.linalg.norm((self.position * scale) - point),
-                intersection_points
-            ))
-            nearest_point = intersection_points[np.argsort(points_distances)[
-                0]]
+    def _place(self):
+        rotation_matrix(self.angle, out=self.rotation)
 
-            pygame.draw.circle(
-                screen,
-                (255, 255, 255),
-                nearest_point.astype(int),
-                5
-            )
+        self.origin[0] = self.position.x
+        self.origin[1] = self.position.y
 
-            # to normalize the distances to [0, 1]
-            distances[i] = np.sort(points_distances)[
-                0] / (self.ray_length * scale)
+    def _update_distance(self, scale):
+        track_progress = self.track.get_progress(self.origin * scale)
 
-        return distances
+        # wrap the difference around the start line
+        length = self.track.length
+        progress = (track_progress - self.track_progress +
+                    length / 2) % length - length / 2
 
-    def _update_distance(self):
-        self.traveled_distance = np.linalg.norm(
-            self.position - self.last_position)
+        self.traveled_distance += progress / scale
+        self.track_progress = track_progress
 
     def _calculate_fitness(self, distances):
         if self.time > 0:
-            self.fitness = int(self.game.check_points_multiplyer *
-                               (self.check_point_index * 20)
-                               + self.game.distance_multiplyer * self.traveled_distance)
-            # + self.game.sensors_multiplyer * np.average(distances)
+            self.fitness = (self.check_points_multiplyer *
+                            (self.check_point_index * 20)
+                            + self.distance_multiplyer * self.traveled_distance)
+
+    def update(self, delta_time, scale):
+        if not self.alive:
+            return
 
-    def render(self, screen, delta_time, scale):
         self.time += delta_time
 
-        distances = self._shoot_rays(screen, scale)
+        self._place()
+
+        if self.track_progress is None:
+            self.track_progress = self.track.get_progress(self.origin * scale)
+
+        distances = self._shoot_rays(scale)
 
         if self.manual:
             self._do_physics(delta_time, 0, 0)
@@ -273,51 +300,56 @@ class Car:
 
             self._do_physics(delta_time, output[0][0], output[0][1])
 
-        # Creating graphics
-        car_graphic = Rect(
-            -self.height / 2, -self.width / 2,
-            self.height, self.width,
-            color=self.color
-        )
-        wheels = []
+        # positioning the body
+        self._place()
+        self.body.place(self.rotation, self.origin, scale)
+        self.placed = True
 
-        for i in range(4):
-            wheels.append(
-                Rect(
-                    -self.wheel_radius,
-                    -self.wheel_width / 2,
-                    self.wheel_radius * 2,
-                    self.wheel_width,
-                    color=(0, 255, 0)
-                )
+        # Calculate traveled distance
+        self._check_for_checkpoints(self.body.vertices)
+
+        # out of track detection
+        self._check_wall_collisions(self.body.vertices)
+
+        self._update_distance(scale)
+        self._calculate_fitness(distances)
+
+    def render(self, screen, scale):
+        if not self.placed:
+            return
+
+        for (start, end), direction, distance in zip(self.rays, self.rays_directions, self.distances):
+            pygame.draw.line(
+                screen,
+                (255, 0, 0),
+                start,
+                end
             )
 
-        # positioning them
-        car_graphic.rotate(self.angle)
-        car_graphic.translate(self.position.x, self.position.y)
-        car_graphic.render(screen, scale)
+            if distance != np.inf:
+                pygame.draw.circle(
+                    screen,
+                    (255, 255, 255),
+                    (start + direction * distance).astype(int),
+                    5
+                )
 
-        # Calculate traveled distance
-        self._check_for_checkpoints(car_graphic.vertices)
+        self.body.render(screen)
 
-        # out of track detection
-        self._check_wall_collisions(car_graphic.vertices)
+        rotation_matrix(self.steering, out=self.steering_rotation)
 
         # rear wheels
-        for wheel, side in zip(wheels[:2], [1, -1]):
-            wheel.translate(-self.height / 2 +
-                            self.wheel_radius, side * self.width / 2)
-            wheel.rotate(self.angle)
-            wheel.translate(self.position.x, self.position.y)
-            wheel.render(screen, scale)
+        for wheel in self.wheels[:2]:
+            wheel.place(self.rotation, self.origin, scale)
+            wheel.render(screen)
 
         # front wheels
-        for wheel, side in zip(wheels[2:], [1, -1]):
-            wheel.rotate(self.steering)
-            wheel.translate(self.height / 2, side * self.width / 2)
-            wheel.rotate(self.angle)
-            wheel.translate(self.position.x, self.position.y)
-            wheel.render(screen, scale)
-
-        self._update_distance()
-        self._calculate_fitness(distances)
+        for wheel, offset in zip(self.wheels[2:], self.front_wheels_offsets):
+            wheel.place(
+                self.rotation,
+                self.origin,
+                scale,
+                local_rotation=self.steering_rotation,
+                offset=offset
+            )
+            wheel.render(screen)
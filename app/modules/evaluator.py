@@ -0,0 +1,65 @@
+import os
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from app.modules.track import Track
+from app.modules.fleet import Fleet
+
+
+# Tracks of a worker process, loaded once when the worker starts
+_worker_tracks = []
+
+
+def _init_worker(points_files):
+    global _worker_tracks
+
+    _worker_tracks = [Track(points_file) for points_file in points_files]
+
+
+def simulate(track, genomes, network_options, delta_time, **fleet_options):
+    fleet = Fleet(track, genomes, network_options, **fleet_options)
+
+    while fleet.alive.any():
+        fleet.step(delta_time)
+
+    return fleet.fitness.copy()
+
+
+def _evaluate(genomes, network_options, delta_time, fleet_options):
+    return np.stack([
+        simulate(track, genomes, network_options, delta_time, **fleet_options)
+        for track in _worker_tracks
+    ])
+
+
+class Evaluator:
+    def __init__(self, points_files, workers=None):
+        if isinstance(points_files, str):
+            points_files = [points_files]
+
+        self.points_files = points_files
+        self.workers = workers or os.cpu_count()
+
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_init_worker,
+            initargs=(points_files,)
+        )
+
+    def evaluate(self, genomes, network_options, delta_time, **fleet_options):
+        # genomes is a (P, D) array, each worker simulates a chunk of it on
+        # every track, the fitness is a (tracks, P) array
+        chunks = [
+            chunk for chunk in np.array_split(genomes, self.workers)
+            if len(chunk) > 0
+        ]
+
+        futures = [
+            self.executor.submit(
+                _evaluate, chunk, network_options, delta_time, fleet_options)
+            for chunk in chunks
+        ]
+
+        return np.concatenate([future.result() for future in futures], axis=1)
+
+    def close(self):
+        self.executor.shutdown()
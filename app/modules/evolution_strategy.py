@@ -0,0 +1,154 @@
+import json
+import numpy as np
+
+
+class EvolutionStrategy:
+    def __init__(self, sigma=0.5, parents_fraction=0.5, rng=None):
+        # CMA-ES, the genomes are drawn from a gaussian whose mean, scale
+        # and covariance follow the best genomes of each generation
+        self.initial_sigma = sigma
+        self.parents_fraction = parents_fraction
+
+        self.rng = rng if rng is not None else np.random.default_rng()
+
+        # set up from the first generation it is given
+        self.mean = None
+
+    def _setup_constants(self, population_size, dimensions):
+        self.population_size = population_size
+
+        self.parents_number = max(
+            1, int(population_size * self.parents_fraction))
+
+        # recombination weights of the parents, best first
+        weights = np.log(self.parents_number + .5) - \
+            np.log(np.arange(1, self.parents_number + 1))
+        self.weights = weights / weights.sum()
+        self.mu_eff = 1 / np.sum(self.weights ** 2)
+
+        # learning rates, the defaults of Hansen's tutorial
+        self.c_c = (4 + self.mu_eff / dimensions) / \
+            (dimensions + 4 + 2 * self.mu_eff / dimensions)
+        self.c_sigma = (self.mu_eff + 2) / (dimensions + self.mu_eff + 5)
+        self.c_1 = 2 / ((dimensions + 1.3) ** 2 + self.mu_eff)
+        self.c_mu = min(
+            1 - self.c_1,
+            2 * (self.mu_eff - 2 + 1 / self.mu_eff) /
+            ((dimensions + 2) ** 2 + self.mu_eff)
+        )
+        self.damping = 1 + 2 * max(0, np.sqrt((self.mu_eff - 1) / (dimensions + 1)) - 1) + \
+            self.c_sigma
+        self.expected_norm = np.sqrt(dimensions) * \
+            (1 - 1 / (4 * dimensions) + 1 / (21 * dimensions ** 2))
+
+    def _setup(self, genomes):
+        dimensions = genomes.shape[1]
+
+        self._setup_constants(*genomes.shape)
+
+        # the first generation counts as drawn around its own mean
+        self.mean = genomes.mean(axis=0)
+        self.sigma = self.initial_sigma
+        self.covariance = np.eye(dimensions)
+        self.path_c = np.zeros(dimensions)
+        self.path_sigma = np.zeros(dimensions)
+        self.generation = 0
+
+        self._decompose()
+
+    def _decompose(self):
+        # C = B diag(D^2) B^T, used to draw and to whiten the steps
+        self.covariance = (self.covariance + self.covariance.T) / 2
+
+        eigenvalues, self.basis = np.linalg.eigh(self.covariance)
+        self.scales = np.sqrt(np.maximum(eigenvalues, 1e-20))
+
+        self.inverse_sqrt_covariance = (
+            self.basis / self.scales).dot(self.basis.T)
+
+    def next_generation(self, genomes, fitness):
+        # Same contract as GeneticAlgorithm.next_generation, no genome has
+        # a parent here, they are all drawn from the updated distribution
+        if self.mean is None:
+            self._setup(genomes)
+
+        population_size, dimensions = genomes.shape
+        self.generation += 1
+
+        best = np.argsort(-np.asarray(fitness), kind='stable')[
+            :self.parents_number]
+
+        steps = (genomes[best] - self.mean) / self.sigma
+        mean_step = self.weights.dot(steps)
+
+        self.mean = self.mean + self.sigma * mean_step
+
+        # evolution paths, the sigma one in the whitened space
+        self.path_sigma = (1 - self.c_sigma) * self.path_sigma + \
+            np.sqrt(self.c_sigma * (2 - self.c_sigma) * self.mu_eff) * \
+            self.inverse_sqrt_covariance.dot(mean_step)
+
+        # Hansen's h_sigma, true while the sigma path is short enough for
+        # the step size to keep up, it gates the covariance path update and
+        # the rank one update makes up for the missing part otherwise
+        path_sigma_norm = np.linalg.norm(self.path_sigma)
+        h_sigma = path_sigma_norm / np.sqrt(1 - (1 - self.c_sigma) ** (2 * self.generation)) / \
+            self.expected_norm < 1.4 + 2 / (dimensions + 1)
+
+        self.path_c = (1 - self.c_c) * self.path_c + \
+            h_sigma * np.sqrt(self.c_c * (2 - self.c_c) * self.mu_eff) * mean_step
+
+        # rank one and rank mu updates of the covariance
+        self.covariance = (1 - self.c_1 - self.c_mu) * self.covariance + \
+            self.c_1 * (np.outer(self.path_c, self.path_c) +
+                        (1 - h_sigma) * self.c_c * (2 - self.c_c) * self.covariance) + \
+            self.c_mu * (steps.T * self.weights).dot(steps)
+
+        self.sigma *= np.exp(self.c_sigma / self.damping *
+                             (path_sigma_norm / self.expected_norm - 1))
+
+        self._decompose()
+
+        # the whole population at once, (P, D) standard normal draws
+        # shaped by the covariance
+        draws = self.rng.standard_normal((population_size, dimensions))
+        next_genomes = self.mean + self.sigma * \
+            (draws * self.scales).dot(self.basis.T)
+
+        return next_genomes, np.full(population_size, -1)
+
+    def get_state(self):
+        # arrays saved along the checkpoints, see Game.save_checkpoint
+        state = {'rng_state': json.dumps(self.rng.bit_generator.state)}
+
+        if self.mean is not None:
+            state.update({
+                'population_size': self.population_size,
+                'mean': self.mean,
+                'sigma': self.sigma,
+                'covariance': self.covariance,
+                'path_c': self.path_c,
+                'path_sigma': self.path_sigma,
+                'generation': self.generation
+            })
+
+        return state
+
+    def set_state(self, state):
+        self.rng.bit_generator.state = json.loads(str(state['rng_state']))
+
+        if 'mean' not in state:
+            self.mean = None
+
+            return
+
+        self._setup_constants(int(state['population_size']), len(state['mean']))
+
+        self.mean = state['mean']
+        self.sigma = float(state['sigma'])
+        self.covariance = state['covariance']
+        self.path_c = state['path_c']
+        self.path_sigma = state['path_sigma']
+        self.generation = int(state['generation'])
+
+        self._decompose()
@@ -0,0 +1,89 @@
+import os
+import hashlib
+import numpy as np
+from collections import OrderedDict
+
+
+# bump when the simulation scores the cars differently, the fitness kept
+# by older runs are then ignored
+FITNESS_CACHE_VERSION = 2
+
+
+class FitnessCache:
+    def __init__(self, max_size=100000, cache_file=None):
+        # least recently used fitness are dropped past max_size
+        self.max_size = max_size
+        self.entries = OrderedDict()
+
+        # kept across runs when given, see save
+        self.cache_file = cache_file
+
+        self.hits = 0
+        self.misses = 0
+
+        if cache_file is not None and os.path.exists(cache_file):
+            self.load(cache_file)
+
+    def _get_keys(self, genomes, context):
+        # the same genome on the same track with the same simulation
+        # always drives the same way
+        return [
+            hashlib.sha1(context + genome.tobytes()).digest()
+            for genome in np.ascontiguousarray(genomes, dtype=float)
+        ]
+
+    def lookup(self, genomes, context):
+        fitness = np.zeros(len(genomes))
+        found = np.zeros(len(genomes), dtype=bool)
+
+        for i, key in enumerate(self._get_keys(genomes, context)):
+            value = self.entries.get(key)
+
+            if value is not None:
+                fitness[i] = value
+                found[i] = True
+
+                self.entries.move_to_end(key)
+
+        self.hits += np.count_nonzero(found)
+        self.misses += len(genomes) - np.count_nonzero(found)
+
+        return fitness, found
+
+    def store(self, genomes, context, fitness):
+        for key, value in zip(self._get_keys(genomes, context), fitness):
+            self.entries[key] = float(value)
+            self.entries.move_to_end(key)
+
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def save(self, cache_file=None):
+        cache_file = cache_file if cache_file is not None else self.cache_file
+
+        directory = os.path.dirname(cache_file)
+
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # written aside then moved, like the track cache
+        temporary_file = f'{cache_file}.{os.getpid()}.tmp'
+
+        with open(temporary_file, 'wb') as file:
+            np.savez(
+                file,
+                keys=np.frombuffer(
+                    b''.join(self.entries.keys()), dtype=np.uint8).reshape(-1, 20),
+                fitness=np.array(list(self.entries.values()), dtype=float)
+            )
+
+        os.replace(temporary_file, cache_file)
+
+    def load(self, cache_file):
+        with np.load(cache_file) as cache:
+            # oldest first, the order of the least recently used
+            for key, value in zip(cache['keys'], cache['fitness']):
+                self.entries[key.tobytes()] = float(value)
+
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
@@ -0,0 +1,487 @@
+import pygame
+import numpy as np
+from contextlib import nullcontext
+from app.utils.math import cast_rays, intersect_segments, transform_vertices, rotation_matrix, place_vertices
+from app.modules.population_network import PopulationNetwork
+from app.modules.graphics.sprite_cache import SpriteCache
+
+
+class Fleet:
+    def __init__(self, track, genomes, network_options, colors=None, scale=1, game=None, length=4, max_steering=np.pi / 2, max_acceleration=5.0, check_points_multiplyer=5, distance_multiplyer=1, swept=True, pruning=None, engine='segments', profiler=None, sprites=None, laps=1, max_steps=10000, substeps=1):
+        self.track = track
+        self.genomes = genomes
+        self.scale = scale
+
+        # every network evaluated at once
+        self.population_network = PopulationNetwork(genomes, **network_options)
+
+        self.game = game
+
+        self.size = len(genomes)
+        self.colors = colors if colors is not None else [
+            (255, 0, 0)] * self.size
+
+        # car configuration, shared by the whole fleet
+        self.width = .5
+        self.height = 1
+        self.length = length
+
+        self.wheel_radius = 0.3 / 2
+        self.wheel_width = 0.2 / 2
+
+        self.max_acceleration = max_acceleration
+        self.max_steering = max_steering
+        self.max_velocity = 20
+
+        self.ray_length = 10
+        self.timeout = 5
+
+        # the cars retire once they drove that many laps, and the whole
+        # fleet after max_steps steps so a good driver can't stall it
+        self.laps = laps
+        self.max_steps = max_steps
+
+        # test the path of the car corners since the last step too, so
+        # large timesteps can't jump over walls and checkpoints
+        self.swept = swept
+
+        # physics and collision steps per step, the cars sense and decide
+        # once per step
+        self.substeps = substeps
+
+        # 'segments' intersects the track walls, 'field' samples the track
+        # signed distance field instead
+        self.engine = engine
+
+        # times the stages of every step when given, see
+        # app.modules.profiler
+        self.profiler = profiler
+
+        # car bodies drawn from pre-rotated sprites, pass one cache to
+        # every fleet to share them across generations
+        self.sprites = sprites if sprites is not None else SpriteCache()
+        self.sprite_angles = 72
+        self.sprite_steerings = 2
+
+        # policies killing the cars going nowhere, see app.modules.pruning
+        self.pruning = pruning if pruning is not None else []
+
+        # fitness multiplyers
+        self.check_points_multiplyer = check_points_multiplyer
+        self.distance_multiplyer = distance_multiplyer
+
+        head_light_angle = np.arctan((self.width / 2) / (self.height / 2))
+
+        self.rays_angles = np.array([
+            0,
+            head_light_angle,
+            -head_light_angle,
+            np.pi / 2,
+            -np.pi / 2,
+            np.pi + head_light_angle,
+            np.pi + -head_light_angle,
+        ])
+
+        # Query the track spatial index only when it narrows the segments
+        # to test, on small tracks testing all of them is cheaper
+        self.rays_radius = self.ray_length * scale
+        self.body_radius = np.hypot(self.width / 2, self.height / 2) * scale
+
+        self.index_rays = self._should_use_index(self.rays_radius)
+
+        # local vertices of the body, centered on the car position
+        self.body_vertices = np.array([
+            [-self.height / 2, -self.width / 2],
+            [self.height / 2, -self.width / 2],
+            [self.height / 2, self.width / 2],
+            [-self.height / 2, self.width / 2]
+        ])
+
+        # graphics templates in the car frame, built once and placed with
+        # one rotation per sprite or per drawn car
+        self.wheel_vertices = np.array([
+            [-self.wheel_radius, -self.wheel_width / 2],
+            [self.wheel_radius, -self.wheel_width / 2],
+            [self.wheel_radius, self.wheel_width / 2],
+            [-self.wheel_radius, self.wheel_width / 2]
+        ])
+        self.rear_wheels = np.concatenate([
+            self.wheel_vertices + [-self.height / 2 + self.wheel_radius, side * self.width / 2]
+            for side in [1, -1]
+        ])
+        self.front_wheels_offsets = np.array([
+            [self.height / 2, side * self.width / 2] for side in [1, -1]
+        ])
+        self.local_rays = np.stack(
+            [np.cos(self.rays_angles), -np.sin(self.rays_angles)],
+            axis=-1
+        ) * self.ray_length * scale
+
+        # half size of the sprites, the steered front wheels reach past the
+        # body corners
+        self.sprite_radius = max(
+            np.linalg.norm(np.concatenate(
+                [self.body_vertices, self.rear_wheels]), axis=1).max(),
+            np.linalg.norm(self.front_wheels_offsets, axis=1).max() +
+            np.linalg.norm(self.wheel_vertices, axis=1).max()
+        ) * scale
+
+        # State of every car, one row per car
+        starting_point = np.array(track.starting_point, dtype=float) / scale
+
+        self.time = 0
+        self.steps = 0
+        self.starting_positions = np.tile(starting_point, (self.size, 1))
+        self.positions = self.starting_positions.copy()
+        self.velocities = np.zeros(self.size)
+        self.angles = np.zeros(self.size)
+        self.steering = np.zeros(self.size)
+        self.accelerations = np.zeros(self.size)
+
+        self.check_point_indices = np.zeros(self.size, dtype=int)
+        self.last_check_point_updated_times = np.zeros(self.size)
+        # distance traveled along the track centerline, backward counts
+        # negative and a lap adds the whole centerline length
+        self.traveled_distances = np.zeros(self.size)
+        self.track_progress = track.get_progress(self.positions * scale)
+        self.fitness = np.zeros(self.size)
+
+        self.alive = np.ones(self.size, dtype=bool)
+
+        self.distances = np.full((self.size, len(self.rays_angles)), np.inf)
+        self.bodies = transform_vertices(
+            self.body_vertices, self.angles, self.positions) * scale
+        self.previous_bodies = self.bodies.copy()
+
+        for policy in self.pruning:
+            policy.reset(self)
+
+    def _should_use_index(self, radius):
+        return self.track.spatial_index.get_candidates_number(radius) < len(self.track.segments)
+
+    def _measure(self, stage):
+        if self.profiler is None:
+            return nullcontext()
+
+        return self.profiler.measure(stage)
+
+    def _kill(self, indices, reason):
+        self.alive[indices] = False
+
+        if self.game is not None:
+            for index in indices:
+                self.game.remove(index, reason)
+
+    def _shoot_rays(self, cars):
+        angles = self.angles[cars, np.newaxis] + self.rays_angles
+
+        origins = self.positions[cars, np.newaxis] * self.scale
+        directions = np.stack(
+            [np.cos(angles), -np.sin(angles)],
+            axis=-1
+        ) * self.ray_length * self.scale
+
+        if self.engine == 'field':
+            hits_distances = self.track.cast_rays_field(origins, directions)
+
+            return hits_distances / (self.ray_length * self.scale)
+
+        segments = self.track.segments
+
+        if self.index_rays:
+            segments = self.track.segments_around(
+                origins[:, 0], self.rays_radius)[:, np.newaxis]
+
+        hits_distances = cast_rays(origins, directions, segments)
+
+        # to normalize the distances to [0, 1]
+        return hits_distances / (self.ray_length * self.scale)
+
+    def _predict(self, cars):
+        # predicting for the whole fleet avoids gathering the weights of
+        # the cars still alive on every step
+        return self.population_network.predict(self.distances)[cars]
+
+    def _do_physics(self, cars, delta_time, outputs):
+        self.steering[cars] = outputs[:, 0] * self.max_steering
+        self.accelerations[cars] = (outputs[:, 1] + 1) / 2 * \
+            self.max_acceleration
+
+        # integrate the position
+        velocities = np.clip(
+            self.velocities[cars] + self.accelerations[cars] * delta_time,
+            -self.max_velocity,
+            self.max_velocity
+        )
+        angles = self.angles[cars]
+
+        # bicycle model, a null steering gives a null angular velocity
+        angular_velocities = velocities * \
+            np.sin(self.steering[cars]) / (self.length / 2)
+
+        self.positions[cars] += np.stack(
+            [np.cos(angles), -np.sin(angles)],
+            axis=-1
+        ) * velocities[:, np.newaxis] * delta_time
+        self.angles[cars] += angular_velocities * delta_time
+        self.velocities[cars] = velocities
+
+    def _get_segments(self, vertices):
+        # (..., K, 2) polygons to their (..., K, 4) closed edges
+        return np.concatenate(
+            [vertices, np.roll(vertices, -1, axis=-2)],
+            axis=-1
+        )
+
+    def _get_body_segments(self, cars):
+        segments = self._get_segments(self.bodies[cars])
+
+        if self.swept:
+            # path of every corner from the previous step
+            paths = np.concatenate(
+                [self.previous_bodies[cars], self.bodies[cars]], axis=-1)
+
+            segments = np.concatenate([segments, paths], axis=1)
+
+        return segments
+
+    def _check_for_checkpoints(self, cars, body_segments):
+        timed_out = np.abs(
+            self.time - self.last_check_point_updated_times[cars]) > self.timeout
+
+        # the indices count the checkpoints crossed, laps included, the
+        # last checkpoint of the track ends a lap
+        count = len(self.track.check_points_segments)
+        finish = count * self.laps
+
+        # a swept car can cross several checkpoints in one step, they are
+        # tested in order until one is missed
+        checking = np.ones(len(cars), dtype=bool)
+        updated = np.zeros(len(cars), dtype=bool)
+
+        for i in range(count if self.swept else 1):
+            indices = self.check_point_indices[cars]
+            check_points = self.track.check_points_segments[indices % count]
+
+            crossed = checking & np.isfinite(intersect_segments(
+                body_segments,
+                check_points[:, np.newaxis]
+            )).any(axis=-1)
+
+            if not crossed.any():
+                break
+
+            updated |= crossed
+
+            self.check_point_indices[cars[crossed]] += 1
+            checking = crossed & (self.check_point_indices[cars] < finish)
+
+        self.last_check_point_updated_times[cars[updated]] = self.time
+
+        finished = self.check_point_indices[cars] >= finish
+
+        return timed_out, finished
+
+    def _check_wall_collisions(self, cars, body_segments, delta_time):
+        if self.engine == 'field':
+            # ends and middles of the body edges (and corner paths) leaving
+            # the track
+            points = np.concatenate([
+                body_segments[..., :2],
+                (body_segments[..., :2] + body_segments[..., 2:]) / 2
+            ], axis=1)
+
+            return (self.track.get_distance(points) < 0).any(axis=1)
+
+        segments = self.track.segments
+
+        radius = self.body_radius
+
+        if self.swept:
+            radius += self.max_velocity * delta_time * self.scale
+
+        if self._should_use_index(radius):
+            segments = self.track.segments_around(
+                self.positions[cars] * self.scale, radius)[:, np.newaxis]
+
+        hits = intersect_segments(
+            body_segments[:, :, np.newaxis],
+            segments
+        )
+
+        return np.isfinite(hits).any(axis=(1, 2))
+
+    def _update_distance(self, cars):
+        track_progress = self.track.get_progress(
+            self.positions[cars] * self.scale)
+
+        # wrap the difference around the start line
+        length = self.track.length
+        progress = (track_progress - self.track_progress[cars] +
+                    length / 2) % length - length / 2
+
+        self.traveled_distances[cars] += progress / self.scale
+        self.track_progress[cars] = track_progress
+
+    def _calculate_fitness(self, cars):
+        if self.time > 0:
+            self.fitness[cars] = (self.check_points_multiplyer *
+                                  (self.check_point_indices[cars] * 20)
+                                  + self.distance_multiplyer * self.traveled_distances[cars])
+
+    def step(self, delta_time):
+        cars = np.flatnonzero(self.alive)
+
+        if len(cars) == 0:
+            return
+
+        self.time += delta_time
+        self.steps += 1
+
+        with self._measure('sensing'):
+            self.distances[cars] = self._shoot_rays(cars)
+
+        with self._measure('inference'):
+            outputs = self._predict(cars)
+
+        timed_out = np.zeros(len(cars), dtype=bool)
+        finished = np.zeros(len(cars), dtype=bool)
+        crashed = np.zeros(len(cars), dtype=bool)
+
+        # the finished and crashed cars stop on the substep they are done
+        moving = np.ones(len(cars), dtype=bool)
+
+        for i in range(self.substeps):
+            substep_cars = cars[moving]
+
+            with self._measure('physics'):
+                self._do_physics(
+                    substep_cars, delta_time / self.substeps, outputs[moving])
+
+            with self._measure('collision'):
+                self.previous_bodies[substep_cars] = self.bodies[substep_cars]
+                self.bodies[substep_cars] = transform_vertices(
+                    self.body_vertices,
+                    self.angles[substep_cars],
+                    self.positions[substep_cars]
+                ) * self.scale
+
+                body_segments = self._get_body_segments(substep_cars)
+
+                timed_out[moving], finished[moving] = self._check_for_checkpoints(
+                    substep_cars, body_segments)
+
+                # out of track detection
+                crashed[moving] = self._check_wall_collisions(
+                    substep_cars, body_segments, delta_time / self.substeps)
+
+            moving &= ~(finished | crashed)
+
+            if not moving.any():
+                break
+
+        if self.profiler is not None:
+            self.profiler.count_step(len(cars))
+
+        self._update_distance(cars)
+        self._calculate_fitness(cars)
+
+        pruned = np.zeros(len(cars), dtype=bool)
+
+        for policy in self.pruning:
+            pruned |= policy.check(self, cars, delta_time)
+
+        # every car is removed once, for the first of these reasons
+        removed = finished.copy()
+        self._kill(cars[finished], 'finished')
+
+        for mask, reason in [(crashed, 'crashed'), (timed_out, 'timed out'), (pruned, 'pruned')]:
+            self._kill(cars[mask & ~removed], reason)
+            removed |= mask
+
+        if self.max_steps is not None and self.steps >= self.max_steps:
+            self._kill(cars[~removed], 'out of steps')
+
+    def _get_local_vertices(self, steering):
+        # body, rear wheels then front wheels steered around their center,
+        # (12, 2) vertices in the car frame
+        front_wheels = self.wheel_vertices.dot(rotation_matrix(steering))
+
+        return np.concatenate([
+            self.body_vertices,
+            self.rear_wheels,
+            *(front_wheels + offset for offset in self.front_wheels_offsets)
+        ])
+
+    def _build_sprite(self, color, angle, steering):
+        size = int(np.ceil(2 * self.sprite_radius)) + 4
+        center = np.array([size / 2, size / 2])
+
+        sprite = pygame.Surface((size, size), pygame.SRCALPHA)
+
+        local_vertices = self._get_local_vertices(steering)
+        vertices = place_vertices(local_vertices, rotation_matrix(
+            angle), center / self.scale, self.scale, np.empty_like(local_vertices))
+
+        pygame.draw.polygon(sprite, color, vertices[:4])
+
+        for wheel in vertices[4:].reshape(-1, 4, 2):
+            pygame.draw.polygon(sprite, (0, 255, 0), wheel)
+
+        return sprite
+
+    def _get_sprite(self, car):
+        # angles and steerings are rounded so the sprites can be reused
+        angle_step = 2 * np.pi / self.sprite_angles
+        steering_step = self.max_steering / self.sprite_steerings
+
+        angle_index = int(round(self.angles[car] / angle_step)) % self.sprite_angles
+        steering_index = int(round(self.steering[car] / steering_step))
+
+        color = tuple(self.colors[car])
+
+        return self.sprites.get(
+            (color, angle_index, steering_index),
+            lambda: self._build_sprite(
+                color, angle_index * angle_step, steering_index * steering_step)
+        )
+
+    def _render_rays(self, screen, car):
+        origin = self.positions[car] * self.scale
+        directions = self.local_rays.dot(rotation_matrix(self.angles[car]))
+
+        for direction, distance in zip(directions, self.distances[car]):
+            pygame.draw.line(
+                screen,
+                (255, 0, 0),
+                origin,
+                origin + direction
+            )
+
+            if distance != np.inf:
+                pygame.draw.circle(
+                    screen,
+                    (255, 255, 255),
+                    (origin + direction * distance).astype(int),
+                    5
+                )
+
+    def _render_car(self, screen, car, rays=True):
+        if rays:
+            self._render_rays(screen, car)
+
+        sprite = self._get_sprite(car)
+        size = np.array(sprite.get_size())
+
+        screen.blit(sprite, self.positions[car] * self.scale - size / 2)
+
+    def get_best_car(self):
+        # index of the best car still alive
+        return np.argmax(np.where(self.alive, self.fitness, -np.inf))
+
+    def render(self, screen, cars=None, rays=True):
+        if cars is None:
+            cars = np.flatnonzero(self.alive)
+
+        for car in cars:
+            self._render_car(screen, car, rays)
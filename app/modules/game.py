@@ -1,39 +1,146 @@
-import copy
-import random
+import os
+import json
+import hashlib
 import pygame
 import numpy as np
-from app.modules.neural_network import NeuralNetwork
+from app.modules.neural_network import NeuralNetwork, get_parameters_number
+from app.modules.genetic_algorithm import GeneticAlgorithm
+from app.modules.selection import RouletteSelection
 from app.modules.track import Track
-from app.modules.car import Car
+from app.modules.fleet import Fleet
+from app.modules.evaluator import simulate
+from app.modules.fitness_cache import FITNESS_CACHE_VERSION
+from app.modules.simulation_clock import SimulationClock
+from app.modules.graphics.sprite_cache import SpriteCache
 
 
 class Game:
-    def __init__(self, screen, scale=1, cars_per_generation=80):
+    def __init__(self, screen=None, scale=1, cars_per_generation=80, evaluator=None, selection=None, clock=None, seed=None, pruning=None, engine='segments', checkpoint_file=None, checkpoint_every=1, profiler=None, tracks=None, aggregate='mean', elitism=0, fitness_cache=None, optimizer=None, max_steps=10000):
+        # without a screen the game runs headless, nothing is drawn
         self.screen = screen
         self.scale = scale
 
-        self.number_of_cars_at_time = 5
+        # fixed timestep of the simulation, independent from the frames
+        self.clock = clock if clock is not None else SimulationClock()
+
+        # the simulation follows real time sped up by speed, or runs
+        # steps_per_frame steps per update as fast as the frames go
+        self.speed = 1
+        self.steps_per_frame = None
+
+        # drawing every frame and every car costs more than simulating them
+        self.render_every = 1
+        self.render_best_only = False
+        self.render_rays = True
+        self.frames = 0
+
+        # sprites of the cars, kept from one generation to the next
+        self.sprites = SpriteCache()
+
+        # policies ending the evaluation of hopeless cars early
+        self.pruning = pruning if pruning is not None else []
+
+        # how the cars sense and hit the walls, see Fleet
+        self.engine = engine
+
+        # steps after which a generation ends, whoever is still driving
+        self.max_steps = max_steps
+
+        # every random draw goes through this generator, same seed same run
+        self.seed = seed
+        self.rng = np.random.default_rng(seed)
+
+        # evaluates whole generations in worker processes when given, each
+        # worker only sees a chunk of the population
+        self.evaluator = evaluator
+
+        if self.evaluator is not None and any(policy.ranked for policy in self.pruning):
+            raise ValueError(
+                'the ranked pruning policies need the whole population, evaluate it in process')
+
+        # times the simulation stages and the rendering when given
+        self.profiler = profiler
+
+        # snapshot of the run every checkpoint_every generations when given
+        self.checkpoint_file = checkpoint_file
+        self.checkpoint_every = checkpoint_every
 
         # font for the stats
-        self.font = pygame.font.SysFont(None, 20)
+        self.font = None
+
+        if self.screen is not None:
+            self.font = pygame.font.SysFont(None, 20)
 
         # fitness multiplyers
         self.check_points_multiplyer = 5
         self.distance_multiplyer = 1
         self.sensors_multiplyer = .1
 
+        self.network_options = {
+            'inputs': 7,
+            'outputs': 2,
+            'hidden_layers': 2,
+            'hidden_neurons': 7
+        }
+
         # Genetic algorithm configuration
         self.cars_per_generation = cars_per_generation
         self.mutation_rate = 0.05  # 10% of randomizing
         self.number_to_cross_over = 40
+        self.selection = selection if selection is not None else RouletteSelection()
+
+        # breeds the next generation from the fitness of the last one, any
+        # object with GeneticAlgorithm's next_generation, get_state and
+        # set_state, see app.modules.evolution_strategy
+        self.optimizer = optimizer
+
+        if self.optimizer is None:
+            self.optimizer = GeneticAlgorithm(
+                NeuralNetwork(**self.network_options).get_split_mask(),
+                mutation_rate=self.mutation_rate,
+                number_to_cross_over=self.number_to_cross_over,
+                selection=self.selection,
+                elitism=elitism,
+                rng=self.rng
+            )
 
         self.current_generation = 1
-        self.population = []
 
-        self.current_cars = []
-        self.playing_cars = []
+        # one flat NeuralNetwork parameters per row
+        self.genomes = None
+        self.colors = []
+        self.fitness = np.zeros(cars_per_generation)
 
-        self.track = Track('path.json')
+        # every genome drives on every track, one after the other, and its
+        # fitness is the mean or the min of its fitness on each of them
+        self.tracks = tracks if tracks is not None else [Track('path.json')]
+        self.aggregate = aggregate
+        self.track_index = 0
+        self.track = self.tracks[0]
+        self.tracks_fitness = np.zeros((len(self.tracks), cars_per_generation))
+
+        # how the cars of the generation were removed
+        self.removed_count = {}
+
+        # best driver seen so far
+        self.best_genome = None
+        self.best_fitness = -np.inf
+
+        # fitness of the genomes already simulated, only used when the
+        # fitness of a car depends on its genome alone
+        self.fitness_cache = fitness_cache
+
+        if not all(policy.memoizable for policy in self.pruning):
+            self.fitness_cache = None
+
+        # the policies configuration, taken before any fleet adds its state
+        self.pruning_config = [
+            (type(policy).__name__, sorted(vars(policy).items()))
+            for policy in self.pruning
+        ]
+
+        # every car of the generation is simulated at once
+        self.fleet = None
 
         self._setup_first_generation()
 
@@ -43,32 +150,57 @@ class Game:
         b_color = np.linspace(0, 255, self.cars_per_generation)
 
         return (
-            random.choice(r_color),
-            random.choice(g_color),
-            random.choice(b_color)
+            self.rng.choice(r_color),
+            self.rng.choice(g_color),
+            self.rng.choice(b_color)
+        )
+
+    def _get_fleet_options(self):
+        return {
+            'scale': self.scale,
+            'check_points_multiplyer': self.check_points_multiplyer,
+            'distance_multiplyer': self.distance_multiplyer,
+            'pruning': self.pruning,
+            'engine': self.engine,
+            'max_steps': self.max_steps,
+            'substeps': self.clock.substeps
+        }
+
+    def _start_fleet(self, track_index=0):
+        if track_index == 0:
+            self.fitness = np.zeros(self.cars_per_generation)
+            self.tracks_fitness = np.zeros(
+                (len(self.tracks), self.cars_per_generation))
+            self.removed_count = {}
+
+        self.track_index = track_index
+        self.track = self.tracks[track_index]
+
+        self.fleet = Fleet(
+            self.track,
+            self.genomes,
+            self.network_options,
+            colors=self.colors,
+            game=self,
+            profiler=self.profiler,
+            sprites=self.sprites,
+            **self._get_fleet_options()
         )
 
     def _setup_first_generation(self):
-        starting_x = self.track.starting_point[0] / self.scale
-        starting_y = self.track.starting_point[1] / self.scale
-
-        for i in range(self.cars_per_generation):
-            r_color = np.linspace(0, 255, 80)[i]
-
-            self.current_cars.append(
-                Car(
-                    starting_x,
-                    starting_y,
-                    color=self._get_random_color(),
-                    game=self,
-                    track=self.track,
-                    manual=False
-                )
-            )
+        self.genomes = self.rng.uniform(
+            -1.0, 1.0,
+            (self.cars_per_generation, get_parameters_number(**self.network_options))
+        )
+        self.colors = [
+            self._get_random_color() for i in range(self.cars_per_generation)
+        ]
+
+        self._start_fleet()
 
     def _render_stats(self):
         text = self.font.render(
-            f'Generation: {self.current_generation}, Number of cars left: {len(self.current_cars)}',
+            f'Generation: {self.current_generation}, Track: {self.track_index + 1}/{len(self.tracks)}, Number of cars left: {np.count_nonzero(self.fleet.alive)}, {self._get_speed_text()}',
             True,
             (255, 255, 255)
         )
@@ -77,118 +209,302 @@ class Game:
 
         self.screen.blit(text, textRect)
 
-    def _mutate(self, value):
-        if np.random.uniform(0, 1) < self.mutation_rate:
-            return np.random.uniform(-1.0, 1.0)
+        if self.profiler is not None:
+            self._render_profiler_stats(textRect.height)
 
-        return value
+    def _get_speed_text(self):
+        if self.steps_per_frame is not None:
+            text = f'Steps per frame: {self.steps_per_frame}'
+        else:
+            text = f'Speed: x{self.speed:g}'
 
-    def _merge(self, parent_1, parent_2, child1, child2):
-        for i in range(child1.hidden_layers_number + 1):
-            if i < int((child1.hidden_layers_number + 1) / 2):
-                child1.biases[i] = self._mutate(parent_1.biases[i])
-                child2.biases[i] = self._mutate(parent_2.biases[i])
-            else:
-                child1.biases[i] = self._mutate(parent_2.biases[i])
-                child2.biases[i] = self._mutate(parent_1.biases[i])
-
-            for j in range(len(child1.weights[i])):
-                for k in range(len(child1.weights[i][j])):
-                    if k < int(len(child1.weights[i][j]) / 2):
-                        child1.weights[i][j][k] = self._mutate(
-                            parent_1.weights[i][j][k])
-                        child2.weights[i][j][k] = self._mutate(
-                            parent_2.weights[i][j][k])
-                    else:
-                        child1.weights[i][j][k] = self._mutate(
-                            parent_2.weights[i][j][k])
-                        child2.weights[i][j][k] = self._mutate(
-                            parent_1.weights[i][j][k])
+        if self.render_every > 1:
+            text += f', Rendering 1 frame out of {self.render_every}'
+
+        return text
+
+    def _render_profiler_stats(self, top):
+        stats = self.profiler.get_stats()
+
+        if stats is None:
+            return
+
+        lines = [
+            f'FPS: {stats["fps"]:.0f}, Steps/s: {stats["steps_per_second"]:.0f}, Cars/s: {stats["cars_per_second"]:.0f}',
+            ', '.join(
+                f'{stage}: {stats[stage] * 1000:.2f}ms' for stage in self.profiler.STAGES)
+        ]
+
+        for line in lines:
+            text = self.font.render(line, True, (255, 255, 255))
+            textRect = text.get_rect()
+            textRect.topleft = (0, top)
+
+            self.screen.blit(text, textRect)
+
+            top += textRect.height
 
     def _increase_generation(self):
-        starting_x = self.track.starting_point[0] / self.scale
-        starting_y = self.track.starting_point[1] / self.scale
+        best = np.argmax(self.fitness)
+
+        if self.fitness[best] > self.best_fitness:
+            self.best_fitness = self.fitness[best]
+            self.best_genome = self.genomes[best].copy()
 
         self.current_generation += 1
 
-        genes_pool = []
+        self.genomes, parents = self.optimizer.next_generation(
+            self.genomes, self.fitness)
+
+        # children take the color of one of their parents
+        self.colors = [
+            self.colors[parent] if parent >= 0 else self._get_random_color()
+            for parent in parents
+        ]
+
+        if self.checkpoint_file is not None and \
+                (self.current_generation - 1) % self.checkpoint_every == 0:
+            self.save_checkpoint(self.checkpoint_file)
+
+        self._start_fleet()
+
+    def save_checkpoint(self, checkpoint_file):
+        directory = os.path.dirname(checkpoint_file)
+
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # written aside then moved, a preempted run keeps its last snapshot
+        temporary_file = f'{checkpoint_file}.{os.getpid()}.tmp'
+
+        with open(temporary_file, 'wb') as file:
+            np.savez(
+                file,
+                genomes=self.genomes,
+                colors=np.array(self.colors, dtype=float).reshape(-1, 3),
+                # of the generation the genomes were bred from
+                fitness=self.fitness,
+                current_generation=self.current_generation,
+                best_genome=self.best_genome if self.best_genome is not None else np.zeros(0),
+                best_fitness=self.best_fitness,
+                network_options=json.dumps(self.network_options),
+                # to replay the champions where they were trained
+                tracks=json.dumps(
+                    [track.points_file for track in self.tracks]),
+                engine=self.engine,
+                rng_state=json.dumps(self.rng.bit_generator.state),
+                optimizer=type(self.optimizer).__name__,
+                **{
+                    f'optimizer_{name}': value
+                    for name, value in self.optimizer.get_state().items()
+                }
+            )
+
+        os.replace(temporary_file, checkpoint_file)
+
+    def load_checkpoint(self, checkpoint_file):
+        with np.load(checkpoint_file) as checkpoint:
+            if json.loads(str(checkpoint['network_options'])) != self.network_options:
+                raise ValueError(
+                    f'{checkpoint_file} was saved with other network options')
+
+            # older checkpoints only kept the state of cma-es
+            optimizer = str(checkpoint['optimizer']) if 'optimizer' in checkpoint.files else (
+                'EvolutionStrategy' if any(name.startswith('optimizer_') for name in checkpoint.files) else 'GeneticAlgorithm')
+
+            if optimizer != type(self.optimizer).__name__:
+                raise ValueError(
+                    f'{checkpoint_file} was saved with the {optimizer} optimizer')
+
+            self.genomes = checkpoint['genomes']
+            self.colors = [tuple(color) for color in checkpoint['colors']]
+            self.cars_per_generation = len(self.genomes)
+            self.current_generation = int(checkpoint['current_generation'])
+
+            self.best_fitness = float(checkpoint['best_fitness'])
+            self.best_genome = checkpoint['best_genome'] if len(
+                checkpoint['best_genome']) else None
+
+            # the genetic algorithm draws from the same generator
+            self.rng.bit_generator.state = json.loads(
+                str(checkpoint['rng_state']))
+
+            self.optimizer.set_state({
+                name[len('optimizer_'):]: checkpoint[name]
+                for name in checkpoint.files if name.startswith('optimizer_')
+            })
+
+        self._start_fleet()
+
+    def remove(self, index, reason='crashed'):
+        self.tracks_fitness[self.track_index,
+                            index] = self.fleet.fitness[index]
+        self.removed_count[reason] = self.removed_count.get(reason, 0) + 1
+
+    def _aggregate_fitness(self):
+        if self.aggregate == 'min':
+            self.fitness = self.tracks_fitness.min(axis=0)
+        else:
+            self.fitness = self.tracks_fitness.mean(axis=0)
+
+    def _next_track(self):
+        if self.track_index < len(self.tracks) - 1:
+            self._start_fleet(self.track_index + 1)
+        else:
+            self._aggregate_fitness()
+            self._increase_generation()
+
+    def _get_cache_context(self, track):
+        fleet_options = self._get_fleet_options()
+        fleet_options['pruning'] = self.pruning_config
+
+        context = json.dumps([
+            FITNESS_CACHE_VERSION,
+            track.cache_key,
+            self.clock.delta_time,
+            self.network_options,
+            fleet_options
+        ], sort_keys=True, default=repr)
+
+        return hashlib.sha1(context.encode()).digest()
+
+    def _evaluate_with_cache(self):
+        contexts = [self._get_cache_context(track) for track in self.tracks]
+
+        tracks_fitness = np.zeros((len(self.tracks), self.cars_per_generation))
+        missing = np.zeros(self.cars_per_generation, dtype=bool)
+
+        for i, context in enumerate(contexts):
+            tracks_fitness[i], found = self.fitness_cache.lookup(
+                self.genomes, context)
+            missing |= ~found
+
+        if not missing.any():
+            return tracks_fitness
+
+        # only the genomes missing on any track are simulated
+        genomes = self.genomes[missing]
+
+        if self.evaluator is None:
+            fitness = np.stack([
+                simulate(track, genomes, self.network_options, self.clock.delta_time,
+                         profiler=self.profiler, **self._get_fleet_options())
+                for track in self.tracks
+            ])
+        else:
+            fitness = self.evaluator.evaluate(
+                genomes,
+                self.network_options,
+                self.clock.delta_time,
+                **self._get_fleet_options()
+            )
+
+        tracks_fitness[:, missing] = fitness
+
+        for context, track_fitness in zip(contexts, fitness):
+            self.fitness_cache.store(genomes, context, track_fitness)
+
+        return tracks_fitness
+
+    def run_generation(self):
+        if self.fitness_cache is not None:
+            self.tracks_fitness = self._evaluate_with_cache()
+        elif self.evaluator is None:
+            for track_index in range(self.track_index, len(self.tracks)):
+                if track_index != self.track_index:
+                    self._start_fleet(track_index)
+
+                while self.fleet.alive.any():
+                    self.fleet.step(self.clock.delta_time)
+        else:
+            self.tracks_fitness = self.evaluator.evaluate(
+                self.genomes,
+                self.network_options,
+                self.clock.delta_time,
+                **self._get_fleet_options()
+            )
 
-        # Filling the genes pool
-        for fitness, neural_network, color in self.population:
-            number_of_times = int(fitness * 10)
+        self._aggregate_fitness()
 
-            for i in range(number_of_times):
-                genes_pool.append(
-                    [copy.deepcopy(neural_network), color, fitness]
-                )
+        if self.profiler is not None:
+            self.profiler.frame()
 
-        # Cross over the networks
-        for i in range(self.number_to_cross_over):
-            first_dna = random.choice(genes_pool)
-            second_dna = None
+        self._increase_generation()
 
-            while second_dna == None or first_dna == second_dna:
-                second_dna = random.choice(genes_pool)
+    def step(self):
+        self.fleet.step(self.clock.delta_time)
 
-            print('parent 1: ', first_dna[2])
-            print('parent 2: ', second_dna[2])
+        self.clock.tick()
 
-            first_parent = first_dna[0]
-            second_parent = second_dna[0]
+        if not self.fleet.alive.any():
+            self._next_track()
 
-            child_1 = Car(starting_x, starting_y, game=self,
-                          track=self.track, manual=False)
-            child_2 = Car(starting_x, starting_y, game=self,
-                          track=self.track, manual=False)
+    def update_inputs(self, event):
+        if event.type != pygame.KEYDOWN:
+            return
 
-            self._merge(first_parent, second_parent,
-                        child_1.neural_network, child_2.neural_network)
+        if event.key in (pygame.K_PLUS, pygame.K_EQUALS, pygame.K_KP_PLUS):
+            if self.steps_per_frame is None:
+                self.speed *= 2
+            else:
+                self.steps_per_frame *= 2
 
-            if np.random.uniform(0, 1) > .5:
-                child_1.color = first_dna[1]
-                child_2.color = second_dna[1]
+        elif event.key in (pygame.K_MINUS, pygame.K_KP_MINUS):
+            if self.steps_per_frame is None:
+                self.speed = max(self.speed / 2, 1 / 8)
             else:
-                child_2.color = first_dna[1]
-                child_1.color = second_dna[1]
+                self.steps_per_frame = max(self.steps_per_frame // 2, 1)
 
-            self.current_cars.append(child_1)
-            self.current_cars.append(child_2)
+        elif event.key == pygame.K_f:
+            self.steps_per_frame = 16 if self.steps_per_frame is None else None
 
-        for i in range(self.cars_per_generation - (self.number_to_cross_over * 2)):
-            self.current_cars.append(
-                Car(starting_x, starting_y, color=self._get_random_color(), game=self,
-                    track=self.track, manual=False)
-            )
+        elif event.key == pygame.K_b:
+            self.render_best_only = not self.render_best_only
 
-        self.population = []
+        elif event.key == pygame.K_r:
+            self.render_rays = not self.render_rays
 
-    def remove(self, car):
-        if car in self.current_cars:
-            self.population.append(
-                [car.fitness, copy.deepcopy(car.neural_network), car.color])
-            self.current_cars.remove(car)
-            self.playing_cars.remove(car)
+        elif event.key == pygame.K_n:
+            self.render_every = self.render_every * 2 if self.render_every < 32 else 1
 
-            print(car.fitness)
+    def update(self, elapsed_time):
+        self.frames += 1
 
-    def update_inputs(self, event):
-        for car in self.current_cars:
-            car.inputs.update_inputs(event)
+        if self.steps_per_frame is not None:
+            steps = self.steps_per_frame
+        else:
+            # runs the fixed steps due after elapsed_time of real time
+            steps = self.clock.advance(
+                elapsed_time * self.speed,
+                max_steps=int(np.ceil(self.clock.max_steps * self.speed))
+            )
 
-    def update(self, delta_time):
-        self._render_stats()
+        for i in range(steps):
+            self.step()
 
+    def should_render(self):
+        return self.screen is not None and self.frames % self.render_every == 0
+
+    def _render_scene(self):
         self.track.render(self.screen)
 
-        if len(self.playing_cars) == 0:
-            self.playing_cars = self.current_cars[:self.number_of_cars_at_time]
+        if self.render_best_only:
+            self.fleet.render(
+                self.screen, [self.fleet.get_best_car()], self.render_rays)
+        else:
+            self.fleet.render(self.screen, rays=self.render_rays)
 
-        for car in self.playing_cars:
-            car.render(
-                self.screen,
-                delta_time,
-                self.scale
-            )
+    def render(self):
+        if self.screen is None:
+            return
 
-        if len(self.current_cars) == 0:
-            self._increase_generation()
+        if self.profiler is None:
+            self._render_scene()
+        else:
+            with self.profiler.measure('rendering'):
+                self._render_scene()
+
+        self._render_stats()
+
+        if self.profiler is not None:
+            self.profiler.frame()
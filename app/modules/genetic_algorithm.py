@@ -0,0 +1,101 @@
+import numpy as np
+from app.modules.selection import RouletteSelection
+
+
+class GeneticAlgorithm:
+    def __init__(self, split_mask, mutation_rate=0.05, number_to_cross_over=40, elitism=0, selection=None, crossover='split', mutation='uniform', mutation_scale=0.1, rng=None):
+        # genes the first child takes from the first parent in a split
+        # crossover, see NeuralNetwork.get_split_mask
+        self.split_mask = split_mask
+
+        self.mutation_rate = mutation_rate
+        self.number_to_cross_over = number_to_cross_over
+
+        # number of the best genomes kept untouched
+        self.elitism = elitism
+
+        # picks the couples of parents, see app.modules.selection
+        self.selection = selection if selection is not None else RouletteSelection()
+
+        # 'split' or 'uniform'
+        self.crossover_type = crossover
+        # 'uniform' replaces genes, 'gaussian' adds noise of mutation_scale
+        self.mutation_type = mutation
+        self.mutation_scale = mutation_scale
+
+        self.rng = rng if rng is not None else np.random.default_rng()
+
+    def crossover(self, parents_1, parents_2):
+        if self.crossover_type == 'split':
+            mask = self.split_mask
+        else:
+            mask = self.rng.random(parents_1.shape) < .5
+
+        return (
+            np.where(mask, parents_1, parents_2),
+            np.where(mask, parents_2, parents_1)
+        )
+
+    def mutate(self, genomes):
+        mask = self.rng.random(genomes.shape) < self.mutation_rate
+
+        if self.mutation_type == 'gaussian':
+            genomes += mask * self.rng.normal(0, self.mutation_scale, genomes.shape)
+        else:
+            genomes[mask] = self.rng.uniform(-1.0, 1.0, np.count_nonzero(mask))
+
+        return genomes
+
+    def next_generation(self, genomes, fitness):
+        # Returns the genomes of the next generation and, for each of them,
+        # the index of the genome it inherits its color from, -1 for the
+        # random newcomers
+        population_size = len(genomes)
+
+        next_genomes = np.empty_like(genomes)
+        parents = np.full(population_size, -1)
+
+        elites = np.argsort(-np.asarray(fitness), kind='stable')[:self.elitism]
+
+        next_genomes[:len(elites)] = genomes[elites]
+        parents[:len(elites)] = elites
+
+        offset = len(elites)
+
+        # Cross over the genomes
+        number = min(self.number_to_cross_over,
+                     (population_size - offset) // 2)
+
+        first_parents, second_parents = self.selection.select(
+            fitness, number, self.rng)
+
+        children_1, children_2 = self.crossover(
+            genomes[first_parents], genomes[second_parents])
+
+        children = next_genomes[offset:offset + 2 * number]
+        children[0::2] = children_1
+        children[1::2] = children_2
+
+        self.mutate(children)
+
+        in_order = self.rng.random(number) > .5
+
+        parents[offset:offset + 2 * number:2] = np.where(
+            in_order, first_parents, second_parents)
+        parents[offset + 1:offset + 2 * number:2] = np.where(
+            in_order, second_parents, first_parents)
+
+        offset += 2 * number
+
+        # fill the rest with random genomes
+        next_genomes[offset:] = self.rng.uniform(
+            -1.0, 1.0, (population_size - offset, genomes.shape[1]))
+
+        return next_genomes, parents
+
+    def get_state(self):
+        # nothing but the random generator, which Game saves itself
+        return {}
+
+    def set_state(self, state):
+        pass
@@ -1,6 +1,6 @@
 import pygame
 import numpy as np
-from app.utils.math import rotate_vector
+from app.utils.math import rotate_vector, place_vertices
 
 
 class Rect:
@@ -12,27 +12,41 @@ class Rect:
 
         self.color = color
 
-        self.vertices = [
-            np.array([x, y]),
-            np.array([x + width, y]),
-            np.array([x + width, y + height]),
-            np.array([x, y + height])
-        ]
+        # local vertices, the rect is placed from them every frame
+        self.local_vertices = np.array([
+            [x, y],
+            [x + width, y],
+            [x + width, y + height],
+            [x, y + height]
+        ], dtype=float)
+
+        self.vertices = self.local_vertices.copy()
+
+        # holds the vertices between the local and the world placements
+        self.buffer = np.empty_like(self.local_vertices)
 
     def translate(self, x, y):
-        for i in range(len(self.vertices)):
-            self.vertices[i] += np.array([x, y])
+        self.vertices += (x, y)
 
     def rotate(self, angle):
-        for i in range(len(self.vertices)):
-            self.vertices[i] = rotate_vector(self.vertices[i], angle)
+        self.vertices = rotate_vector(self.vertices, angle)
 
-    def render(self, screen, scale):
-        self.vertices = list(map(
-            lambda vertex: vertex * scale,
-            self.vertices
-        ))
+    def scale(self, scale):
+        self.vertices *= scale
+
+    def place(self, rotation, position, scale=1, local_rotation=None, offset=None):
+        vertices = self.local_vertices
+
+        # local placement, e.g. the steering of a front wheel
+        if local_rotation is not None:
+            vertices = np.matmul(vertices, local_rotation, out=self.buffer)
+
+        if offset is not None:
+            vertices = np.add(vertices, offset, out=self.buffer)
+
+        place_vertices(vertices, rotation, position, scale, out=self.vertices)
 
+    def render(self, screen):
         pygame.draw.polygon(
             screen,
             self.color,
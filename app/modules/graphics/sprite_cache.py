@@ -0,0 +1,33 @@
+from collections import OrderedDict
+
+
+class SpriteCache:
+    def __init__(self, max_size=1024):
+        # least recently used sprites are dropped past max_size
+        self.max_size = max_size
+        self.sprites = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, build):
+        sprite = self.sprites.get(key)
+
+        if sprite is not None:
+            self.hits += 1
+            self.sprites.move_to_end(key)
+
+            return sprite
+
+        self.misses += 1
+
+        sprite = build()
+        self.sprites[key] = sprite
+
+        if len(self.sprites) > self.max_size:
+            self.sprites.popitem(last=False)
+
+        return sprite
+
+    def clear(self):
+        self.sprites.clear()
@@ -1,9 +1,30 @@
-import copy
 import numpy as np
 
 
+def get_layers_shapes(inputs, hidden_layers, hidden_neurons, outputs):
+    shapes = []
+
+    for i in range(hidden_layers + 1):
+        # Check if its the first set of weights
+        if i == 0:
+            shapes.append((inputs, hidden_neurons))
+        elif i == hidden_layers:
+            shapes.append((hidden_neurons, outputs))
+        else:
+            shapes.append((hidden_neurons, hidden_neurons))
+
+    return shapes
+
+
+def get_parameters_number(inputs=1, hidden_layers=1, hidden_neurons=1, outputs=1):
+    shapes = get_layers_shapes(inputs, hidden_layers, hidden_neurons, outputs)
+
+    # the weights of every layer followed by one bias per layer
+    return sum(rows * columns for rows, columns in shapes) + len(shapes)
+
+
 class NeuralNetwork:
-    def __init__(self, inputs=1, hidden_layers=1, hidden_neurons=1, outputs=1):
+    def __init__(self, inputs=1, hidden_layers=1, hidden_neurons=1, outputs=1, parameters=None, rng=None):
         self.inputs = inputs
         self.hidden_layers_number = hidden_layers
         self.hidden_neurons_number = hidden_neurons
@@ -14,28 +35,31 @@ class NeuralNetwork:
         self.outputs_layer = np.zeros((1, outputs))
         self.hidden_layers = np.zeros((hidden_layers, 1, hidden_neurons))
 
+        self.layers_shapes = get_layers_shapes(
+            inputs, hidden_layers, hidden_neurons, outputs)
+
+        # Every weight and bias lives in one contiguous array, the weights
+        # and biases of the layers are views on it
+        if parameters is None:
+            rng = rng if rng is not None else np.random.default_rng()
+
+            parameters = rng.uniform(
+                -1.0, 1.0, get_parameters_number(inputs, hidden_layers, hidden_neurons, outputs))
+
+        self.parameters = parameters
+
         self.weights = []
         self.biases = []
 
-        # Create the hidden layers
-
-        for i in range(hidden_layers + 1):
-            self.biases.append(np.random.uniform(-1.0, 1.0))
-
-            # Check if its the first set of weights
-            if i == 0:
-                # This line adds a randmized 2d array of a certain shape
-                self.weights.append(
-                    np.random.uniform(-1, 1, (inputs, hidden_neurons))
-                )
-            elif i == len(self.hidden_layers):
-                self.weights.append(
-                    np.random.uniform(-1, 1, (hidden_neurons, outputs))
-                )
-            else:
-                self.weights.append(
-                    np.random.uniform(-1, 1, (hidden_neurons, hidden_neurons))
-                )
+        offset = 0
+
+        for rows, columns in self.layers_shapes:
+            self.weights.append(
+                self.parameters[offset:offset + rows * columns].reshape(rows, columns))
+            offset += rows * columns
+
+        for i in range(len(self.layers_shapes)):
+            self.biases.append(self.parameters[offset + i:offset + i + 1].reshape(()))
 
     def show(self):
         print(self.inputs_layer.shape, end='---')
@@ -50,8 +74,33 @@ class NeuralNetwork:
         print('')
 
     def copy(self, neural_network):
-        self.weights = copy.deepcopy(neural_network.weights)
-        self.biases = copy.deepcopy(neural_network.biases)
+        self.parameters[:] = neural_network.parameters
+
+        return self
+
+    def get_split_mask(self):
+        # genes a child takes from its first parent in a half/half split:
+        # the first half of the biases and of every weights row
+        mask = np.zeros(len(self.parameters), dtype=bool)
+
+        offset = 0
+
+        for rows, columns in self.layers_shapes:
+            mask[offset:offset + rows * columns] = np.tile(
+                np.arange(columns) < int(columns / 2), rows)
+            offset += rows * columns
+
+        layers_number = len(self.layers_shapes)
+        mask[offset:] = np.arange(layers_number) < int(layers_number / 2)
+
+        return mask
+
+    def to_array(self):
+        # flat genome, every layer weights followed by the biases
+        return self.parameters.copy()
+
+    def from_array(self, array):
+        self.parameters[:] = array
 
         return self
 
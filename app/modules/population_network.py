@@ -0,0 +1,52 @@
+import numpy as np
+from app.modules.neural_network import get_layers_shapes
+
+
+class PopulationNetwork:
+    def __init__(self, genomes, inputs=1, hidden_layers=1, hidden_neurons=1, outputs=1):
+        # genomes is a (P, D) array, one flat NeuralNetwork parameters per row
+        self.genomes = genomes
+        self.size = len(genomes)
+
+        layers_shapes = get_layers_shapes(
+            inputs, hidden_layers, hidden_neurons, outputs)
+        self.layers_number = len(layers_shapes)
+
+        # (P, in, out) weights and (P, 1, 1) biases per layer, both views on
+        # the genomes
+        self.weights = []
+        self.biases = []
+
+        offset = 0
+
+        for rows, columns in layers_shapes:
+            self.weights.append(
+                genomes[:, offset:offset + rows * columns].reshape(self.size, rows, columns))
+            offset += rows * columns
+
+        for i in range(self.layers_number):
+            self.biases.append(
+                genomes[:, offset + i:offset + i + 1].reshape(self.size, 1, 1))
+
+        # Preallocated layers, reused by every prediction
+        self.inputs_layer = np.zeros((self.size, 1, inputs))
+        self.layers = [
+            np.zeros((self.size, 1, columns))
+            for rows, columns in layers_shapes
+        ]
+
+    def predict(self, inputs):
+        # inputs is a (P, inputs) array, one row per network. The returned
+        # (P, outputs) array is overwritten by the next prediction
+        np.tanh(inputs, out=self.inputs_layer[:, 0, :])
+
+        previous_layer = self.inputs_layer
+
+        for weights, biases, layer in zip(self.weights, self.biases, self.layers):
+            np.matmul(previous_layer, weights, out=layer)
+            layer += biases
+            np.tanh(layer, out=layer)
+
+            previous_layer = layer
+
+        return self.layers[-1][:, 0, :]
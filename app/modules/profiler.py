@@ -0,0 +1,92 @@
+import csv
+import json
+import time
+from collections import deque
+from contextlib import contextmanager
+
+
+class Profiler:
+    STAGES = ['sensing', 'inference', 'physics', 'collision', 'rendering']
+
+    def __init__(self, window=120, keep_history=False):
+        # the HUD averages over the last window frames, the history keeps
+        # every frame for the export
+        self.samples = deque(maxlen=window)
+        self.history = [] if keep_history else None
+
+        self.frames = 0
+        self.last_frame_time = time.perf_counter()
+
+        self._reset_frame()
+
+    def _reset_frame(self):
+        self.current = {stage: 0.0 for stage in self.STAGES}
+        self.steps = 0
+        self.cars = 0
+
+    @contextmanager
+    def measure(self, stage):
+        start = time.perf_counter()
+
+        yield
+
+        self.current[stage] += time.perf_counter() - start
+
+    def count_step(self, cars):
+        self.steps += 1
+        self.cars += cars
+
+    def frame(self):
+        # closes the frame, or any unit of work like a generation
+        now = time.perf_counter()
+
+        sample = {
+            'frame': self.frames,
+            'seconds': now - self.last_frame_time,
+            'steps': self.steps,
+            'cars': self.cars,
+            **self.current
+        }
+
+        self.samples.append(sample)
+
+        if self.history is not None:
+            self.history.append(sample)
+
+        self.frames += 1
+        self.last_frame_time = now
+
+        self._reset_frame()
+
+    def get_stats(self):
+        seconds = sum(sample['seconds'] for sample in self.samples)
+
+        if seconds == 0:
+            return None
+
+        stats = {
+            'fps': len(self.samples) / seconds,
+            'steps_per_second': sum(sample['steps'] for sample in self.samples) / seconds,
+            'cars_per_second': sum(sample['cars'] for sample in self.samples) / seconds
+        }
+
+        # mean seconds spent in every stage per frame
+        for stage in self.STAGES:
+            stats[stage] = sum(sample[stage]
+                               for sample in self.samples) / len(self.samples)
+
+        return stats
+
+    def export(self, file_name):
+        samples = self.history if self.history is not None else list(
+            self.samples)
+
+        with open(file_name, 'w', newline='') as file:
+            if file_name.endswith('.json'):
+                json.dump({'stats': self.get_stats(),
+                          'frames': samples}, file, indent=2)
+            else:
+                writer = csv.DictWriter(
+                    file, ['frame', 'seconds', 'steps', 'cars', *self.STAGES])
+                writer.writeheader()
+                writer.writerows(samples)
@@ -0,0 +1,129 @@
+import time
+import numpy as np
+
+
+# Policies killing the cars that are going nowhere before their timeout.
+# Fleet calls reset when it starts and check after every step with the
+# indices of the cars alive, check returns the mask of those to kill.
+# A policy is memoizable when the fitness it lets a car reach depends on
+# that car alone, see app.modules.fitness_cache, and ranked when it
+# compares the cars of the fleet with each other, it then needs the whole
+# population in one fleet and can't run in the evaluator chunks
+
+
+class StalledVelocityPruning:
+    def __init__(self, min_velocity=0.5, duration=1.0):
+        self.min_velocity = min_velocity
+        self.duration = duration
+
+        self.memoizable = True
+        self.ranked = False
+
+    def reset(self, fleet):
+        self.stalled_times = np.zeros(fleet.size)
+
+    def check(self, fleet, cars, delta_time):
+        stalled = np.abs(fleet.velocities[cars]) < self.min_velocity
+
+        self.stalled_times[cars] = np.where(
+            stalled, self.stalled_times[cars] + delta_time, 0)
+
+        return self.stalled_times[cars] > self.duration
+
+
+class MovingBackwardPruning:
+    def __init__(self, duration=1.0):
+        self.duration = duration
+
+        self.memoizable = True
+        self.ranked = False
+
+    def reset(self, fleet):
+        self.backward_times = np.zeros(fleet.size)
+
+    def check(self, fleet, cars, delta_time):
+        # moving away from the next checkpoint
+        check_points = fleet.track.check_points_segments[
+            fleet.check_point_indices[cars] % len(fleet.track.check_points_segments)]
+        targets = (check_points[:, :2] + check_points[:, 2:]) / 2
+
+        angles = fleet.angles[cars]
+        velocities = np.stack(
+            [np.cos(angles), -np.sin(angles)], axis=-1) * fleet.velocities[cars, np.newaxis]
+
+        backward = np.sum(
+            velocities * (targets - fleet.positions[cars] * fleet.scale), axis=-1) < 0
+
+        self.backward_times[cars] = np.where(
+            backward, self.backward_times[cars] + delta_time, 0)
+
+        return self.backward_times[cars] > self.duration
+
+
+class NoProgressPruning:
+    def __init__(self, duration=2.0, min_progress=1):
+        self.duration = duration
+        self.min_progress = min_progress
+
+        self.memoizable = True
+        self.ranked = False
+
+    def reset(self, fleet):
+        self.best_fitness = np.zeros(fleet.size)
+        self.progress_times = np.zeros(fleet.size)
+
+    def check(self, fleet, cars, delta_time):
+        progressed = fleet.fitness[cars] >= self.best_fitness[cars] + \
+            self.min_progress
+
+        self.best_fitness[cars] = np.where(
+            progressed, fleet.fitness[cars], self.best_fitness[cars])
+        self.progress_times[cars] = np.where(
+            progressed, 0, self.progress_times[cars] + delta_time)
+
+        return self.progress_times[cars] > self.duration
+
+
+class BudgetPruning:
+    def __init__(self, max_steps=None, max_seconds=None):
+        # steps of the simulation and wall-clock seconds per generation
+        self.max_steps = max_steps
+        self.max_seconds = max_seconds
+
+        # wall-clock budgets depend on the machine
+        self.memoizable = max_seconds is None
+        self.ranked = False
+
+    def reset(self, fleet):
+        self.start_time = time.perf_counter()
+
+    def check(self, fleet, cars, delta_time):
+        over_budget = (
+            (self.max_steps is not None and fleet.steps >= self.max_steps) or
+            (self.max_seconds is not None and time.perf_counter() -
+             self.start_time > self.max_seconds)
+        )
+
+        return np.full(len(cars), over_budget)
+
+
+class BottomFractionPruning:
+    def __init__(self, steps=120, fraction=0.5):
+        self.steps = steps
+        self.fraction = fraction
+
+        self.memoizable = False
+        self.ranked = True
+
+    def reset(self, fleet):
+        pass
+
+    def check(self, fleet, cars, delta_time):
+        pruned = np.zeros(len(cars), dtype=bool)
+
+        # once, after the given number of steps
+        if fleet.steps == self.steps:
+            worst = np.argsort(fleet.fitness[cars], kind='stable')
+            pruned[worst[:int(len(cars) * self.fraction)]] = True
+
+        return pruned
@@ -0,0 +1,156 @@
+import json
+import pygame
+import numpy as np
+from app.modules.track import Track
+from app.modules.fleet import Fleet
+from app.modules.car import Car
+from app.modules.simulation_clock import SimulationClock
+from app.modules.graphics.sprite_cache import SpriteCache
+
+
+class Replay:
+    def __init__(self, screen, genomes, network_options, colors=None, scale=1, track=None, engine='segments', clock=None, manual=False):
+        self.screen = screen
+        self.scale = scale
+
+        self.genomes = genomes
+        self.network_options = network_options
+        self.colors = colors
+
+        # the track and engine of the training run, see from_checkpoints
+        self.track = track if track is not None else Track('path.json')
+        self.engine = engine
+        self.clock = clock if clock is not None else SimulationClock()
+
+        # a car driven with the arrows next to the champions
+        self.manual = manual
+
+        # font for the stats
+        self.font = pygame.font.SysFont(None, 20)
+
+        self.runs = 0
+
+        # sprites of the cars, kept from one run to the next
+        self.sprites = SpriteCache()
+
+        self.fleet = None
+        self.car = None
+
+        self._start_fleet()
+
+        if self.manual:
+            self._start_car()
+
+    @classmethod
+    def from_checkpoints(cls, screen, checkpoint_files, population=False, **options):
+        # the best genome of every snapshot, or the whole population of
+        # the first one, see Game.save_checkpoint
+        genomes = []
+        colors = []
+        network_options = None
+
+        # driven on the first track and with the engine they were trained
+        # with, unless given
+        points_files = None
+        engine = None
+
+        for checkpoint_file in checkpoint_files:
+            with np.load(checkpoint_file) as checkpoint:
+                options_of_file = json.loads(str(checkpoint['network_options']))
+
+                if network_options is not None and options_of_file != network_options:
+                    raise ValueError(
+                        f'{checkpoint_file} was saved with other network options')
+
+                network_options = options_of_file
+
+                if points_files is None and 'tracks' in checkpoint.files:
+                    points_files = json.loads(str(checkpoint['tracks']))
+                    engine = str(checkpoint['engine'])
+
+                if population:
+                    genomes.extend(checkpoint['genomes'])
+                    colors.extend(tuple(color)
+                                  for color in checkpoint['colors'])
+                elif len(checkpoint['best_genome']):
+                    genomes.append(checkpoint['best_genome'])
+                    colors.append((255, 215, 0))
+
+        if not genomes:
+            raise ValueError('no champion to replay in the checkpoints')
+
+        if options.get('track') is None and points_files is not None:
+            options['track'] = Track(points_files[0])
+
+        if options.get('engine') is None:
+            options['engine'] = engine if engine is not None else 'segments'
+
+        return cls(screen, np.array(genomes), network_options, colors=colors, **options)
+
+    def _start_fleet(self):
+        self.runs += 1
+
+        self.fleet = Fleet(
+            self.track,
+            self.genomes,
+            self.network_options,
+            colors=self.colors,
+            scale=self.scale,
+            sprites=self.sprites,
+            engine=self.engine,
+            substeps=self.clock.substeps
+        )
+
+    def _start_car(self):
+        x, y = np.array(self.track.starting_point) / self.scale
+
+        self.car = Car(x, y, color=(255, 255, 255),
+                       track=self.track, manual=True)
+
+    def _render_stats(self):
+        text = f'Run: {self.runs}, Champions left: {np.count_nonzero(self.fleet.alive)}, Best fitness: {self.fleet.fitness.max():.0f}'
+
+        if self.car is not None:
+            text += f', Your fitness: {self.car.fitness:.0f}'
+
+        text = self.font.render(text, True, (255, 255, 255))
+        textRect = text.get_rect()
+        textRect.center = (textRect.width / 2, textRect.height / 2)
+
+        self.screen.blit(text, textRect)
+
+    def update_inputs(self, event):
+        if self.car is not None:
+            self.car.inputs.update_inputs(event)
+
+    def step(self):
+        self.fleet.step(self.clock.delta_time)
+
+        if self.car is not None:
+            for i in range(self.clock.substeps):
+                self.car.update(self.clock.step_time, self.scale)
+
+        self.clock.tick()
+
+        # both restart on their own once done
+        if not self.fleet.alive.any():
+            self._start_fleet()
+
+        if self.car is not None and not self.car.alive:
+            inputs = self.car.inputs
+
+            self._start_car()
+            self.car.inputs = inputs
+
+    def update(self, elapsed_time):
+        for i in range(self.clock.advance(elapsed_time)):
+            self.step()
+
+    def render(self):
+        self.track.render(self.screen)
+        self.fleet.render(self.screen)
+
+        if self.car is not None:
+            self.car.render(self.screen, self.scale)
+
+        self._render_stats()
@@ -0,0 +1,74 @@
+import numpy as np
+
+
+def _draw_couples(weights, number, rng):
+    # Draws couples of different parents with probabilities proportional to
+    # the weights, by searching uniform draws in the cumulative weights
+    cumulative = np.cumsum(weights)
+    total = cumulative[-1]
+    last = len(weights) - 1
+
+    first = np.minimum(
+        np.searchsorted(cumulative, rng.random(number) * total, side='right'), last)
+
+    # the second parent is drawn from the weights left without the first
+    # one, skipping over its slot of the cumulative weights
+    first_weights = weights[first]
+    draws = rng.random(number) * (total - first_weights)
+    draws += (draws >= cumulative[first] - first_weights) * first_weights
+
+    second = np.minimum(
+        np.searchsorted(cumulative, draws, side='right'), last)
+
+    # when the first parent holds all the weight pick any other one
+    alone = total - first_weights <= 0
+    second[alone] = (first[alone] + rng.integers(1, len(weights),
+                                                 size=np.count_nonzero(alone))) % len(weights)
+
+    return first, second
+
+
+class RouletteSelection:
+    def select(self, fitness, number, rng):
+        weights = np.maximum(np.asarray(fitness, dtype=float), 0)
+
+        if weights.sum() <= 0:
+            weights = np.ones(len(weights))
+
+        return _draw_couples(weights, number, rng)
+
+
+class RankSelection:
+    def select(self, fitness, number, rng):
+        # the worst genome has a weight of 1 and the best one of P
+        weights = np.empty(len(fitness))
+        weights[np.argsort(fitness, kind='stable')] = np.arange(1, len(fitness) + 1)
+
+        return _draw_couples(weights, number, rng)
+
+
+class TournamentSelection:
+    def __init__(self, size=3):
+        self.size = size
+
+    def select(self, fitness, number, rng):
+        fitness = np.asarray(fitness)
+
+        contestants = rng.integers(len(fitness), size=(number, self.size))
+        first = contestants[np.arange(number), np.argmax(
+            fitness[contestants], axis=1)]
+
+        # the second tournament is held without the first parent
+        contestants = rng.integers(len(fitness) - 1, size=(number, self.size))
+        contestants += contestants >= first[:, np.newaxis]
+        second = contestants[np.arange(number), np.argmax(
+            fitness[contestants], axis=1)]
+
+        return first, second
+
+
+SELECTIONS = {
+    'roulette': RouletteSelection,
+    'rank': RankSelection,
+    'tournament': TournamentSelection
+}
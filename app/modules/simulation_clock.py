@@ -0,0 +1,35 @@
+class SimulationClock:
+    def __init__(self, delta_time=1 / 60, substeps=1, max_steps=10):
+        # the simulation always advances by delta_time whatever the frame
+        # rate is, the cars sense and decide once per step and move in
+        # substeps physics steps of step_time
+        self.delta_time = delta_time
+        self.substeps = substeps
+        self.step_time = delta_time / substeps
+
+        # steps allowed per update, the late time is dropped past it so a
+        # slow frame can't snowball
+        self.max_steps = max_steps
+
+        self.accumulator = 0
+        self.time = 0
+        self.steps = 0
+
+    def advance(self, elapsed_time, max_steps=None):
+        if max_steps is None:
+            max_steps = self.max_steps
+
+        self.accumulator += elapsed_time
+
+        steps = int(self.accumulator // self.delta_time)
+        self.accumulator -= steps * self.delta_time
+
+        if steps > max_steps:
+            steps = max_steps
+            self.accumulator = 0
+
+        return steps
+
+    def tick(self):
+        self.time += self.delta_time
+        self.steps += 1
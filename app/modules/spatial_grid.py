@@ -0,0 +1,145 @@
+import numpy as np
+
+
+class SpatialGrid:
+    def __init__(self, segments, cell_size=250):
+        self.cell_size = cell_size
+
+        # an extra row of nan, gathered in place of the padding indices
+        self.segments = np.vstack([segments, np.full((1, 4), np.nan)])
+
+        points = segments.reshape(-1, 2)
+
+        self.origin = points.min(axis=0)
+        self.shape = (
+            np.floor((points.max(axis=0) - self.origin) / cell_size).astype(int) + 1
+        )
+
+        columns, rows = self.shape
+        cells = [[] for i in range(columns * rows)]
+
+        # Register every segment in the cells its bounding box covers
+        for index, segment in enumerate(segments):
+            first = self._get_cell(np.minimum(segment[:2], segment[2:]))
+            last = self._get_cell(np.maximum(segment[:2], segment[2:]))
+
+            for x in range(first[0], last[0] + 1):
+                for y in range(first[1], last[1] + 1):
+                    cells[y * columns + x].append(index)
+
+        self.width = max(1, max(len(cell) for cell in cells))
+
+        # one row per cell padded with -1, the last row is an empty cell
+        # used for the queries falling outside of the grid
+        self.cells = np.full((columns * rows + 1, self.width), -1)
+
+        for i, cell in enumerate(cells):
+            self.cells[i, :len(cell)] = cell
+
+        self.empty_cell = columns * rows
+
+    @classmethod
+    def from_arrays(cls, segments, cell_size, origin, shape, cells):
+        # rebuilds a grid saved with to_arrays without registering the
+        # segments again
+        grid = cls.__new__(cls)
+
+        grid.cell_size = float(cell_size)
+        grid.segments = np.vstack([segments, np.full((1, 4), np.nan)])
+        grid.origin = origin
+        grid.shape = shape
+        grid.cells = cells
+        grid.width = cells.shape[1]
+        grid.empty_cell = len(cells) - 1
+
+        return grid
+
+    def to_arrays(self):
+        return {
+            'cell_size': np.array(self.cell_size),
+            'origin': self.origin,
+            'shape': self.shape,
+            'cells': self.cells
+        }
+
+    def _get_cell(self, points):
+        return np.floor((np.asarray(points) - self.origin) / self.cell_size).astype(int)
+
+    def _get_indices(self, cells):
+        cells = np.asarray(cells)
+
+        outside = ((cells < 0) | (cells >= self.shape)).any(axis=-1)
+
+        indices = cells[..., 1] * self.shape[0] + cells[..., 0]
+
+        return np.where(outside, self.empty_cell, indices)
+
+    def _get_segments_indices(self, cells_indices):
+        indices = np.unique(self.cells[cells_indices])
+
+        return indices[indices >= 0]
+
+    def segments_near(self, min_point, max_point):
+        first = np.maximum(self._get_cell(min_point), 0)
+        last = np.minimum(self._get_cell(max_point), self.shape - 1)
+
+        if (first > last).any():
+            return np.zeros(0, dtype=int)
+
+        x, y = np.meshgrid(
+            np.arange(first[0], last[0] + 1),
+            np.arange(first[1], last[1] + 1)
+        )
+
+        return self._get_segments_indices(self._get_indices(np.stack([x, y], axis=-1)))
+
+    def segments_along_ray(self, start, end):
+        start = np.asarray(start, dtype=float)
+        direction = np.asarray(end, dtype=float) - start
+
+        cell = self._get_cell(start)
+        last_cell = self._get_cell(end)
+        step = np.sign(direction).astype(int)
+
+        # Walk the grid cell by cell along the ray
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t_delta = np.abs(self.cell_size / direction)
+            boundaries = self.origin + (cell + (step > 0)) * self.cell_size
+            t_max = np.where(step != 0, (boundaries - start) / direction, np.inf)
+
+        cells = [cell.copy()]
+
+        while (cell != last_cell).any():
+            axis = np.argmin(t_max)
+
+            if t_max[axis] > 1:
+                break
+
+            cell[axis] += step[axis]
+            t_max[axis] += t_delta[axis]
+
+            cells.append(cell.copy())
+
+        return self._get_segments_indices(self._get_indices(cells))
+
+    def get_candidates_number(self, radius):
+        cells_per_axis = int(np.ceil(2 * radius / self.cell_size)) + 1
+
+        return cells_per_axis ** 2 * self.width
+
+    def segments_around(self, centers, radius):
+        # (N, 2) centers to the (N, M, 4) segments of the cells overlapping
+        # the square of the given radius around each of them, padded with nan
+        cells_per_axis = int(np.ceil(2 * radius / self.cell_size)) + 1
+
+        x, y = np.meshgrid(
+            np.arange(cells_per_axis),
+            np.arange(cells_per_axis)
+        )
+        offsets = np.stack([x.ravel(), y.ravel()], axis=-1)
+
+        cells = self._get_cell(np.asarray(centers) - radius)[:, np.newaxis] + offsets
+
+        indices = self.cells[self._get_indices(cells)].reshape(len(centers), -1)
+
+        return self.segments[indices]
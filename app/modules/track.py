@@ -1,42 +1,431 @@
+import os
+import json
+import hashlib
 import pygame
+import numpy as np
 from pygame import Vector2
-import json
+from scipy.ndimage import distance_transform_edt
+from app.modules.spatial_grid import SpatialGrid
+from app.utils.math import grid_in_polygon, distance_to_segments
+
+
+# bump when the compiled arrays change, older caches are then ignored
+CACHE_VERSION = 4
 
 
 class Track:
-    def __init__(self, points_file):
+    def __init__(self, points_file, cell_size=250, progress_resolution=4, field_resolution=4, cache_directory=None, use_cache=True):
         self.points_file = points_file
+        self.cell_size = cell_size
+        self.progress_resolution = progress_resolution
+        self.field_resolution = field_resolution
+
+        # compiled tracks are cached next to the points file by default
+        self.cache_directory = cache_directory if cache_directory is not None else os.path.join(
+            os.path.dirname(os.path.abspath(points_file)), '.track_cache')
 
         self.outer_vertices = []
         self.inner_vertices = []
         self.starting_point = (0, 0)
-        self.check_points = []
-        self.line_segments = []
 
-        self._load_points()
-        self._construct_line_segments(self.outer_vertices)
-        self._construct_line_segments(self.inner_vertices)
+        # (S, 4) array of x1, y1, x2, y2 for the vectorized queries
+        self.segments = np.zeros((0, 4))
+        self.check_points_segments = np.zeros((0, 4))
+
+        # Geometry derived from the segments
+        self.directions = np.zeros((0, 2))
+        self.lengths = np.zeros(0)
+        self.normals = np.zeros((0, 2))
+        self.bounding_box = np.zeros(4)
+
+        self.spatial_index = None
+
+        # closed centerline through the starting point and the middle of
+        # the checkpoints, with the arc length at each of its points
+        self.centerline = np.zeros((0, 2))
+        self.centerline_lengths = np.zeros(0)
+        self.length = 0
+
+        # arc length of the nearest centerline point, one value per
+        # progress_resolution pixels square
+        self.progress_field = np.zeros((0, 0))
+        self.progress_origin = np.zeros(2)
+
+        # cells between the outer and the inner walls, and their signed
+        # distance to the nearest wall, negative off the track, only baked
+        # once the field engine asks for them
+        self._occupancy = None
+        self._distance_field = None
+        self.field_origin = np.zeros(2)
+
+        # pygame objects, only built when asked for
+        self._line_segments = None
+        self._check_points = None
+        self.surface = None
+
+        with open(self.points_file, 'rb') as file:
+            points_bytes = file.read()
+
+        # identifies the layout and the compile settings whatever the file
+        # is named
+        self.cache_key = self._get_cache_key(points_bytes)
+
+        cache_file = os.path.join(
+            self.cache_directory, f'{self.cache_key}.npz')
 
-    def _load_points(self):
-        with open(self.points_file, 'r') as file:
-            points_data = json.loads(file.read())
+        if use_cache and os.path.exists(cache_file):
+            self._load_cache(cache_file)
+        else:
+            self._load_points(json.loads(points_bytes))
+            self._compile()
 
-            self.outer_vertices = points_data['outer_vertices']
-            self.inner_vertices = points_data['inner_vertices']
-            self.starting_point = points_data['starting_point']
-            self.check_points = list(map(lambda points: [Vector2(
-                *points[0]), Vector2(*points[1])], points_data['check_points']))
+            if use_cache:
+                self._save_cache(cache_file)
+
+    def _get_cache_key(self, points_bytes):
+        key = hashlib.sha1(points_bytes)
+        key.update(
+            f'{CACHE_VERSION}-{self.cell_size}-{self.progress_resolution}-{self.field_resolution}'.encode())
+
+        return key.hexdigest()
+
+    def _load_points(self, points_data):
+        self.outer_vertices = points_data['outer_vertices']
+        self.inner_vertices = points_data['inner_vertices']
+        self.starting_point = points_data['starting_point']
+
+        self.check_points_segments = np.array(
+            [[*start, *end] for start, end in points_data['check_points']],
+            dtype=float
+        ).reshape(-1, 4)
 
     def _construct_line_segments(self, vertices):
-        for i in range(len(vertices)):
-            vertex = vertices[i]
-            next_vertex = vertices[i + 1] if i != len(
-                vertices) - 1 else vertices[0]
+        vertices = np.array(vertices, dtype=float).reshape(-1, 2)
+
+        return np.concatenate([vertices, np.roll(vertices, -1, axis=0)], axis=1)
+
+    def _compile(self):
+        self.segments = np.concatenate([
+            self._construct_line_segments(self.outer_vertices),
+            self._construct_line_segments(self.inner_vertices)
+        ])
+
+        self.directions = self.segments[:, 2:] - self.segments[:, :2]
+        self.lengths = np.linalg.norm(self.directions, axis=1)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.normals = np.stack(
+                [-self.directions[:, 1], self.directions[:, 0]],
+                axis=1
+            ) / self.lengths[:, np.newaxis]
+
+        points = self.segments.reshape(-1, 2)
+        self.bounding_box = np.concatenate(
+            [points.min(axis=0), points.max(axis=0)])
+
+        self.spatial_index = SpatialGrid(self.segments, self.cell_size)
+
+        self._compile_progress()
+
+    def _project_on_centerline(self, points):
+        starts = self.centerline[:-1]
+        directions = self.centerline[1:] - starts
+        lengths = np.diff(self.centerline_lengths)
+
+        offsets = points[:, np.newaxis] - starts
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t = np.clip(
+                np.sum(offsets * directions, axis=-1) / lengths ** 2, 0, 1)
+
+        t = np.nan_to_num(t)
+
+        distances = np.linalg.norm(
+            offsets - t[..., np.newaxis] * directions, axis=-1)
+        nearest = np.argmin(distances, axis=1)
+
+        return self.centerline_lengths[nearest] + t[np.arange(len(points)), nearest] * lengths[nearest]
+
+    def _compile_progress(self):
+        middles = (self.check_points_segments[:, :2] +
+                   self.check_points_segments[:, 2:]) / 2
+
+        self.centerline = np.vstack([
+            self.starting_point,
+            middles,
+            self.starting_point
+        ]).astype(float)
+        self.centerline_lengths = np.concatenate([
+            [0],
+            np.cumsum(np.linalg.norm(np.diff(self.centerline, axis=0), axis=1))
+        ])
+        self.length = self.centerline_lengths[-1]
+
+        self.progress_origin, shape, centers = self._get_field_cells(
+            self.progress_resolution)
+
+        progress = np.empty(len(centers))
+
+        # by chunks to bound the (cells, centerline segments) arrays
+        for start in range(0, len(centers), 65536):
+            progress[start:start + 65536] = self._project_on_centerline(
+                centers[start:start + 65536])
+
+        self.progress_field = progress.reshape(shape).astype(np.float32)
+
+    def _get_field_cells(self, resolution):
+        # the fields cover the track with a margin of one ray reach
+        margin = self.cell_size
+        origin = self.bounding_box[:2] - margin
+
+        columns, rows = np.ceil(
+            (self.bounding_box[2:] - self.bounding_box[:2] + 2 * margin) / resolution).astype(int)
+
+        x, y = np.meshgrid(np.arange(columns), np.arange(rows))
+        centers = origin + \
+            (np.stack([x.ravel(), y.ravel()], axis=1) + .5) * resolution
+
+        return origin, (rows, columns), centers
+
+    def _get_wall_cells(self, shape):
+        # cells the walls go through, sampled every quarter of a cell
+        spacing = self.field_resolution / 4
+        counts = np.ceil(self.lengths / spacing).astype(int) + 1
+
+        indices = np.repeat(np.arange(len(self.segments)), counts)
+        t = (np.arange(len(indices)) - np.repeat(np.cumsum(counts) - counts, counts)) / \
+            np.repeat(np.maximum(counts - 1, 1), counts)
+
+        points = self.segments[indices, :2] + \
+            t[:, np.newaxis] * self.directions[indices]
+        cells = np.floor((points - self.field_origin) /
+                         self.field_resolution).astype(int)
+
+        walls = np.zeros(shape, dtype=bool)
+        walls[cells[:, 1], cells[:, 0]] = True
+
+        return walls
+
+    def _compile_distance_field(self, band=3):
+        self.field_origin, shape, centers = self._get_field_cells(
+            self.field_resolution)
+
+        xs, ys = centers[:shape[1], 0], centers[::shape[1], 1]
+
+        self._occupancy = grid_in_polygon(xs, ys, self.outer_vertices) & \
+            ~grid_in_polygon(xs, ys, self.inner_vertices)
+
+        # distance to the nearest cell a wall goes through, lowered by a
+        # cell half diagonal and a sample gap to never exceed the exact one
+        cells_distances = distance_transform_edt(
+            ~self._get_wall_cells(shape)).ravel()
+
+        distances = np.maximum(cells_distances - np.sqrt(2) / 2 - 1 / 8, 0) * \
+            self.field_resolution
 
-            self.line_segments.append([
-                Vector2(*vertex),
-                Vector2(*next_vertex)
-            ])
+        # a lower bound far from the walls is enough to march the rays, the
+        # cells close to them get their exact distance from the segments of
+        # a grid as fine as the band around them
+        near = np.flatnonzero(cells_distances <= band)
+        radius = (band + 1) * self.field_resolution
+
+        grid = SpatialGrid(self.segments, 2 * radius)
+        chunk = max(1, 2 ** 22 // grid.get_candidates_number(radius))
+
+        for start in range(0, len(near), chunk):
+            points = centers[near[start:start + chunk]]
+
+            near_distances = distance_to_segments(
+                points, grid.segments_around(points, radius))
+
+            distances[near[start:start + chunk]] = np.where(
+                np.isnan(near_distances), np.inf, near_distances).min(axis=1)
+
+        distances = distances.reshape(shape)
+
+        self._distance_field = np.where(
+            self._occupancy, distances, -distances).astype(np.float32)
+
+    @property
+    def occupancy(self):
+        if self._occupancy is None:
+            self._compile_distance_field()
+
+        return self._occupancy
+
+    @property
+    def distance_field(self):
+        if self._distance_field is None:
+            self._compile_distance_field()
+
+        return self._distance_field
+
+    def get_distance(self, points):
+        # signed distance to the nearest wall of the (..., 2) points,
+        # bilinearly interpolated between the cells centers
+        field = self.distance_field
+
+        coordinates = (np.asarray(points) - self.field_origin) / \
+            self.field_resolution - .5
+
+        rows, columns = field.shape
+
+        cells = np.floor(coordinates).astype(int)
+        weights = coordinates - cells
+
+        x0 = np.clip(cells[..., 0], 0, columns - 1)
+        x1 = np.clip(cells[..., 0] + 1, 0, columns - 1)
+        y0 = np.clip(cells[..., 1], 0, rows - 1)
+        y1 = np.clip(cells[..., 1] + 1, 0, rows - 1)
+
+        wx, wy = weights[..., 0], weights[..., 1]
+
+        return (
+            (field[y0, x0] * (1 - wx) + field[y0, x1] * wx) * (1 - wy) +
+            (field[y1, x0] * (1 - wx) + field[y1, x1] * wx) * wy
+        )
+
+    def cast_rays_field(self, origins, directions):
+        # sphere tracing of the distance field, same contract as cast_rays
+        origins, directions = np.broadcast_arrays(
+            np.asarray(origins, dtype=float), np.asarray(directions, dtype=float))
+
+        shape = origins.shape[:-1]
+        origins = origins.reshape(-1, 2)
+        directions = directions.reshape(-1, 2)
+
+        lengths = np.linalg.norm(directions, axis=-1)
+        units = directions / lengths[:, np.newaxis]
+
+        # the step is the distance to the walls, so no wall is jumped over,
+        # down to half a cell for the rays grazing them
+        min_step = self.field_resolution / 2
+
+        hits = np.full(len(lengths), np.inf)
+
+        # the rays still marching, their last sample and its distance
+        rays = np.arange(len(lengths))
+        t = np.zeros(len(lengths))
+        previous_t = np.zeros(len(lengths))
+        previous_distances = np.full(len(lengths), np.inf)
+
+        while len(rays):
+            distances = self.get_distance(
+                origins[rays] + units[rays] * t[:, np.newaxis])
+
+            # the wall is where the field crosses zero between the last two
+            # samples, a ray starting off the track hits it right away
+            crossed = distances < 0
+
+            with np.errstate(divide='ignore', invalid='ignore'):
+                hits[rays[crossed]] = np.where(
+                    np.isfinite(previous_distances[crossed]),
+                    previous_t[crossed] + (t - previous_t)[crossed] * previous_distances[crossed] /
+                    (previous_distances - distances)[crossed],
+                    t[crossed]
+                )
+
+            marching = ~crossed & (t < lengths[rays])
+
+            rays = rays[marching]
+            previous_t = t[marching]
+            previous_distances = distances[marching]
+            t = np.minimum(previous_t + np.maximum(previous_distances, min_step), lengths[rays])
+
+        return hits.reshape(shape)
+
+    def get_progress(self, points):
+        # arc length along the centerline of the (N, 2) points
+        cells = np.floor(
+            (np.asarray(points) - self.progress_origin) / self.progress_resolution).astype(int)
+
+        rows, columns = self.progress_field.shape
+
+        return self.progress_field[
+            np.clip(cells[..., 1], 0, rows - 1),
+            np.clip(cells[..., 0], 0, columns - 1)
+        ]
+
+    def _save_cache(self, cache_file):
+        os.makedirs(self.cache_directory, exist_ok=True)
+
+        # written aside then moved, parallel workers may compile at once
+        temporary_file = f'{cache_file}.{os.getpid()}.tmp'
+
+        with open(temporary_file, 'wb') as file:
+            np.savez(
+                file,
+                outer_vertices=np.array(self.outer_vertices, dtype=float),
+                inner_vertices=np.array(self.inner_vertices, dtype=float),
+                starting_point=np.array(self.starting_point, dtype=float),
+                check_points_segments=self.check_points_segments,
+                segments=self.segments,
+                directions=self.directions,
+                lengths=self.lengths,
+                normals=self.normals,
+                bounding_box=self.bounding_box,
+                centerline=self.centerline,
+                centerline_lengths=self.centerline_lengths,
+                progress_field=self.progress_field,
+                progress_origin=self.progress_origin,
+                **{f'spatial_index_{name}': array for name,
+                   array in self.spatial_index.to_arrays().items()}
+            )
+
+        os.replace(temporary_file, cache_file)
+
+    def _load_cache(self, cache_file):
+        with np.load(cache_file) as cache:
+            self.outer_vertices = cache['outer_vertices'].tolist()
+            self.inner_vertices = cache['inner_vertices'].tolist()
+            self.starting_point = cache['starting_point'].tolist()
+
+            self.check_points_segments = cache['check_points_segments']
+            self.segments = cache['segments']
+            self.directions = cache['directions']
+            self.lengths = cache['lengths']
+            self.normals = cache['normals']
+            self.bounding_box = cache['bounding_box']
+
+            self.centerline = cache['centerline']
+            self.centerline_lengths = cache['centerline_lengths']
+            self.length = self.centerline_lengths[-1]
+            self.progress_field = cache['progress_field']
+            self.progress_origin = cache['progress_origin']
+
+            self.spatial_index = SpatialGrid.from_arrays(self.segments, **{
+                name[len('spatial_index_'):]: cache[name]
+                for name in cache.files if name.startswith('spatial_index_')
+            })
+
+    @property
+    def line_segments(self):
+        if self._line_segments is None:
+            self._line_segments = [
+                [Vector2(*segment[:2]), Vector2(*segment[2:])]
+                for segment in self.segments
+            ]
+
+        return self._line_segments
+
+    @property
+    def check_points(self):
+        if self._check_points is None:
+            self._check_points = [
+                [Vector2(*segment[:2]), Vector2(*segment[2:])]
+                for segment in self.check_points_segments
+            ]
+
+        return self._check_points
+
+    def segments_near(self, min_point, max_point):
+        return self.spatial_index.segments_near(min_point, max_point)
+
+    def segments_along_ray(self, start, end):
+        return self.spatial_index.segments_along_ray(start, end)
+
+    def segments_around(self, centers, radius):
+        return self.spatial_index.segments_around(centers, radius)
 
     def _render_path(self, screen, vertices, color=(255, 255, 255), poly_color=(255, 255, 255)):
         pygame.draw.polygon(
@@ -65,9 +454,18 @@ class Track:
                 *segment
             )
 
-    def render(self, screen):
-        self._render_path(screen, self.outer_vertices, color=(
+    def _render_layer(self, size):
+        # the track never moves, it is drawn once and blitted every frame
+        self.surface = pygame.Surface(size)
+
+        self._render_path(self.surface, self.outer_vertices, color=(
             255, 0, 0), poly_color=(169, 169, 169))
-        self._render_path(screen, self.inner_vertices,
+        self._render_path(self.surface, self.inner_vertices,
                           color=(0, 0, 255), poly_color=(0, 0, 0))
-        self._render_check_points(screen)
+        self._render_check_points(self.surface)
+
+    def render(self, screen):
+        if self.surface is None or self.surface.get_size() != screen.get_size():
+            self._render_layer(screen.get_size())
+
+        screen.blit(self.surface, (0, 0))
@@ -0,0 +1,141 @@
+import json
+import numpy as np
+from app.utils.math import intersect_segments
+
+
+class TrackGenerator:
+    def __init__(self, width=1200, height=800, harmonics=8, amplitude=.8, segments=64, track_width=120, check_points=12, margin=20, max_attempts=100, rng=None):
+        # the tracks fit in a width x height screen, margin pixels away
+        # from its borders
+        self.width = width
+        self.height = height
+        self.margin = margin
+
+        # waves of the centerline around a circle, the more harmonics the
+        # twistier and the higher the amplitude the deeper the turns
+        self.harmonics = harmonics
+        self.amplitude = amplitude
+        # vertices of each wall
+        self.segments = segments
+
+        self.track_width = track_width
+        self.check_points = check_points
+
+        # tracks whose walls cross are drawn again
+        self.max_attempts = max_attempts
+
+        self.rng = rng if rng is not None else np.random.default_rng()
+
+    def _get_centerline(self):
+        # closed curve whose distance to its center is a random sum of
+        # sines, damped with their frequency to keep the turns smooth
+        angles = np.arange(self.segments) * 2 * np.pi / self.segments
+        frequencies = np.arange(2, self.harmonics + 1)[:, np.newaxis]
+
+        amplitudes = self.rng.uniform(
+            0, self.amplitude, (len(frequencies), 1)) / frequencies ** 2
+        phases = self.rng.uniform(0, 2 * np.pi, (len(frequencies), 1))
+
+        radii = 1 + np.sum(amplitudes *
+                           np.cos(frequencies * angles + phases), axis=0)
+
+        return np.stack([np.cos(angles), np.sin(angles)], axis=1) * radii[:, np.newaxis]
+
+    def _get_tangents(self, centerline):
+        tangents = np.roll(centerline, -1, axis=0) - \
+            np.roll(centerline, 1, axis=0)
+
+        return tangents / np.linalg.norm(tangents, axis=1)[:, np.newaxis]
+
+    def _place(self, centerline):
+        # the cars start facing +x, the track starts where it goes that way
+        start = np.argmax(self._get_tangents(centerline)[:, 0])
+        centerline = np.roll(centerline, -start, axis=0)
+
+        # then stretched to the screen, keeping room for the walls
+        border = self.margin + self.track_width / 2
+        low, high = centerline.min(axis=0), centerline.max(axis=0)
+        size = np.array([self.width, self.height]) - 2 * border
+
+        return border + (centerline - low) / (high - low) * size
+
+    def _get_walls(self, centerline):
+        tangents = self._get_tangents(centerline)
+        normals = np.stack([-tangents[:, 1], tangents[:, 0]], axis=1)
+
+        left = centerline + normals * self.track_width / 2
+        right = centerline - normals * self.track_width / 2
+
+        return left, right
+
+    def _get_area(self, vertices):
+        x, y = vertices[:, 0], vertices[:, 1]
+
+        return abs(np.sum(x * np.roll(y, -1) - np.roll(x, -1) * y)) / 2
+
+    def _is_valid(self, left, right):
+        # no wall edge may cross another one, besides its neighbours
+        segments = np.concatenate([
+            np.concatenate([wall, np.roll(wall, -1, axis=0)], axis=1)
+            for wall in (left, right)
+        ])
+
+        indices = np.arange(len(segments))
+        wall = indices // self.segments
+        position = indices % self.segments
+
+        for start in range(0, len(segments), 256):
+            rows = slice(start, start + 256)
+
+            hits = np.isfinite(intersect_segments(
+                segments[rows, np.newaxis], segments[np.newaxis]))
+
+            gap = np.abs(position[rows, np.newaxis] - position[np.newaxis])
+            neighbours = (wall[rows, np.newaxis] == wall[np.newaxis]) & \
+                ((gap <= 1) | (gap == self.segments - 1))
+
+            if (hits & ~neighbours).any():
+                return False
+
+        return True
+
+    def _get_points_data(self, centerline, left, right):
+        if self._get_area(left) > self._get_area(right):
+            outer, inner = left, right
+        else:
+            outer, inner = right, left
+
+        # evenly spread across the track, the last one on the start line
+        # where it ends the laps, see Fleet._check_for_checkpoints
+        indices = np.arange(1, self.check_points + 1) * \
+            self.segments // self.check_points % self.segments
+
+        return {
+            'outer_vertices': np.round(outer, 2).tolist(),
+            'inner_vertices': np.round(inner, 2).tolist(),
+            'starting_point': np.round(centerline[0], 2).tolist(),
+            'check_points': [
+                [np.round(left[i], 2).tolist(), np.round(right[i], 2).tolist()]
+                for i in indices
+            ]
+        }
+
+    def generate(self):
+        # a track in the path.json format, see Track._load_points
+        for i in range(self.max_attempts):
+            centerline = self._place(self._get_centerline())
+            left, right = self._get_walls(centerline)
+
+            if self._is_valid(left, right):
+                return self._get_points_data(centerline, left, right)
+
+        raise ValueError(
+            f'no valid track in {self.max_attempts} attempts, try a narrower track or fewer harmonics')
+
+    def save(self, points_file):
+        points_data = self.generate()
+
+        with open(points_file, 'w') as file:
+            file.write(json.dumps(points_data))
+
+        return points_data
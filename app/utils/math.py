@@ -60,3 +60,129 @@ def check_intersection(segment_1, segment_2):
         ])
 
     return []
+
+
+def cross(vectors_1, vectors_2):
+    return vectors_1[..., 0] * vectors_2[..., 1] - vectors_1[..., 1] * vectors_2[..., 0]
+
+
+def intersect_segments(segments_1, segments_2):
+    # segments are (..., 4) arrays of x1, y1, x2, y2 broadcast against each
+    # other. Returns the position [0, 1] of the intersection along
+    # segments_1, inf when the segments don't intersect
+    starts = segments_1[..., :2]
+    directions = segments_1[..., 2:] - starts
+
+    offsets = segments_2[..., :2] - starts
+    edges = segments_2[..., 2:] - segments_2[..., :2]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        denominator = cross(directions, edges)
+
+        t = cross(offsets, edges) / denominator
+        u = cross(offsets, directions) / denominator
+
+    hits = (t >= 0) & (t <= 1) & (u >= 0) & (u <= 1)
+
+    return np.where(hits, t, np.inf)
+
+
+def cast_rays(origins, directions, segments):
+    # origins and directions are (..., 2) arrays, a ray goes from its origin
+    # to origin + direction. segments is a (..., S, 4) array of x1, y1, x2, y2
+    # broadcast against the rays. Returns the distance to the nearest hit of
+    # every ray, inf when missed
+    origins, directions = np.broadcast_arrays(
+        np.asarray(origins, dtype=float),
+        np.asarray(directions, dtype=float)
+    )
+
+    rays = np.concatenate([origins, origins + directions], axis=-1)
+
+    nearest = intersect_segments(
+        rays[..., np.newaxis, :], segments).min(axis=-1)
+
+    return nearest * np.linalg.norm(directions, axis=-1)
+
+
+def transform_vertices(vertices, angles, positions):
+    # rotates (..., K, 2) local vertices by the angles the same way
+    # rotate_vector does, then moves them to the (..., 2) positions
+    cos = np.cos(angles)[..., np.newaxis]
+    sin = np.sin(angles)[..., np.newaxis]
+
+    x, y = vertices[..., 0], vertices[..., 1]
+
+    return np.stack([
+        x * cos + y * sin + positions[..., np.newaxis, 0],
+        -x * sin + y * cos + positions[..., np.newaxis, 1]
+    ], axis=-1)
+
+
+def rotation_matrix(angle, out=None):
+    # matrix used by rotate_vector, filled in place when out is given
+    if out is None:
+        out = np.empty((2, 2))
+
+    cos, sin = np.cos(angle), np.sin(angle)
+
+    out[0, 0] = cos
+    out[0, 1] = -sin
+    out[1, 0] = sin
+    out[1, 1] = cos
+
+    return out
+
+
+def place_vertices(vertices, rotation, position, scale, out):
+    # writes the (K, 2) local vertices rotated, moved to the position and
+    # scaled into the out buffer, without temporary arrays
+    np.matmul(vertices, rotation, out=out)
+
+    out += position
+    out *= scale
+
+    return out
+
+
+def grid_in_polygon(xs, ys, vertices):
+    # even-odd rule on the grid of the sorted xs and ys coordinates,
+    # (len(ys), len(xs)), the crossings are found once per row
+    vertices = np.asarray(vertices, dtype=float)
+    next_vertices = np.roll(vertices, -1, axis=0)
+
+    y = ys[:, np.newaxis]
+    x1, y1 = vertices[:, 0], vertices[:, 1]
+    x2, y2 = next_vertices[:, 0], next_vertices[:, 1]
+
+    crosses = (y1 > y) != (y2 > y)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        crossing_x = np.sort(
+            np.where(crosses, x1 + (y - y1) * (x2 - x1) / (y2 - y1), np.inf), axis=1)
+
+    inside = np.empty((len(ys), len(xs)), dtype=bool)
+
+    # crossings on the right of each point, the others were sorted last
+    for row, count in enumerate(np.count_nonzero(crosses, axis=1)):
+        inside[row] = (count - np.searchsorted(
+            crossing_x[row, :count], xs, side='right')) % 2 == 1
+
+    return inside
+
+
+def distance_to_segments(points, segments):
+    # distance of the (N, 2) points to each of the (S, 4) segments, (N, S),
+    # or to their own (N, S, 4) segments
+    starts = segments[..., :2]
+    directions = segments[..., 2:] - starts
+
+    offsets = points[:, np.newaxis] - starts
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = np.sum(offsets * directions, axis=-1) / \
+            np.sum(directions ** 2, axis=-1)
+
+    t = np.clip(np.nan_to_num(t), 0, 1)
+
+    return np.linalg.norm(offsets - t[..., np.newaxis] * directions, axis=-1)
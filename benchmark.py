@@ -0,0 +1,278 @@
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import numpy as np
+from pygame import Vector2
+from app.utils.math import check_intersection, intersect_segments
+from app.modules.track import Track
+from app.modules.car import Car
+from app.modules.neural_network import NeuralNetwork, get_parameters_number
+from app.modules.population_network import PopulationNetwork
+from app.modules.fleet import Fleet
+from app.modules.game import Game
+from app.modules.simulation_clock import SimulationClock
+
+
+SCALE = 25
+POINTS_FILE = 'path.json'
+DELTA_TIME = 1 / 60
+
+NETWORK_OPTIONS = {
+    'inputs': 7,
+    'outputs': 2,
+    'hidden_layers': 2,
+    'hidden_neurons': 7
+}
+
+FLEET_STAGES = [
+    '_shoot_rays',
+    '_predict',
+    '_do_physics',
+    '_check_for_checkpoints',
+    '_check_wall_collisions'
+]
+
+
+def measure(function, repeat=5, number=10):
+    # best average time of one call over the repeats
+    best = np.inf
+
+    for i in range(repeat):
+        start = time.perf_counter()
+
+        for j in range(number):
+            function()
+
+        best = min(best, (time.perf_counter() - start) / number)
+
+    return best
+
+
+def make_synthetic_track(directory, subdivisions):
+    # path.json with every wall segment split in subdivisions segments
+    with open(POINTS_FILE, 'r') as file:
+        points_data = json.loads(file.read())
+
+    for key in ['outer_vertices', 'inner_vertices']:
+        vertices = np.array(points_data[key], dtype=float)
+        next_vertices = np.roll(vertices, -1, axis=0)
+
+        steps = np.arange(subdivisions)[:, np.newaxis, np.newaxis] / subdivisions
+
+        points_data[key] = (
+            vertices + (next_vertices - vertices) * steps
+        ).transpose(1, 0, 2).reshape(-1, 2).tolist()
+
+    points_file = os.path.join(directory, f'track_{subdivisions}.json')
+
+    with open(points_file, 'w') as file:
+        file.write(json.dumps(points_data))
+
+    return points_file
+
+
+def bench_check_intersection(track):
+    segments = track.line_segments
+    ray = (Vector2(10, 10), Vector2(600, 400))
+
+    seconds = measure(lambda: [
+        check_intersection(segment, ray) for segment in segments
+    ])
+
+    return {'seconds': seconds, 'pairs_per_second': len(segments) / seconds}
+
+
+def bench_intersect_segments(track, cars):
+    rng = np.random.default_rng(0)
+    edges = rng.uniform(0, 1200, (cars, 4, 1, 4))
+
+    seconds = measure(lambda: intersect_segments(edges, track.segments))
+
+    return {
+        'seconds': seconds,
+        'pairs_per_second': cars * 4 * len(track.segments) / seconds
+    }
+
+
+def bench_car(track):
+    x, y = np.array(track.starting_point) / SCALE
+    car = Car(x, y, track=track, rng=np.random.default_rng(0))
+    car.update(DELTA_TIME, SCALE)
+
+    return {
+        'shoot_rays_seconds': measure(lambda: car._shoot_rays(SCALE)),
+        'wall_collisions_seconds': measure(
+            lambda: car._check_wall_collisions(car.body.vertices), number=2)
+    }
+
+
+def bench_predict(cars):
+    rng = np.random.default_rng(0)
+    network = NeuralNetwork(**NETWORK_OPTIONS, rng=rng)
+    inputs = rng.uniform(0, 1, (cars, NETWORK_OPTIONS['inputs']))
+
+    genomes = rng.uniform(
+        -1.0, 1.0, (cars, get_parameters_number(**NETWORK_OPTIONS)))
+    population_network = PopulationNetwork(genomes, **NETWORK_OPTIONS)
+
+    single_seconds = measure(lambda: network.predict(inputs[:1]))
+    population_seconds = measure(lambda: population_network.predict(inputs))
+
+    return {
+        'single_seconds': single_seconds,
+        'population_seconds': population_seconds,
+        'predictions_per_second': cars / population_seconds
+    }
+
+
+def bench_fleet(track, cars, steps=60):
+    genomes = np.random.default_rng(0).uniform(
+        -1.0, 1.0, (cars, get_parameters_number(**NETWORK_OPTIONS)))
+
+    fleet = Fleet(track, genomes, NETWORK_OPTIONS, scale=SCALE)
+
+    # Time each stage of the step by wrapping the fleet methods
+    stages_seconds = {stage: 0 for stage in FLEET_STAGES}
+
+    def wrap(stage):
+        method = getattr(fleet, stage)
+
+        def timed(*args):
+            start = time.perf_counter()
+            result = method(*args)
+            stages_seconds[stage] += time.perf_counter() - start
+
+            return result
+
+        return timed
+
+    for stage in FLEET_STAGES:
+        setattr(fleet, stage, wrap(stage))
+
+    simulated = 0
+    start = time.perf_counter()
+
+    for i in range(steps):
+        simulated += np.count_nonzero(fleet.alive)
+        fleet.step(DELTA_TIME)
+
+    seconds = time.perf_counter() - start
+
+    result = {
+        'step_seconds': seconds / steps,
+        'cars_per_second': simulated / seconds,
+        'steps_per_second': steps / seconds
+    }
+
+    for stage, stage_seconds in stages_seconds.items():
+        result[f'{stage.strip("_")}_seconds'] = stage_seconds / steps
+
+    return result
+
+
+def bench_generation(cars):
+    game = Game(
+        scale=SCALE,
+        cars_per_generation=cars,
+        clock=SimulationClock(DELTA_TIME),
+        seed=0
+    )
+
+    simulated = 0
+    start = time.perf_counter()
+
+    while game.current_generation == 1:
+        simulated += np.count_nonzero(game.fleet.alive)
+        game.step()
+
+    seconds = time.perf_counter() - start
+
+    return {'seconds': seconds, 'cars_per_second': simulated / seconds}
+
+
+def run(quick=False):
+    results = {}
+
+    segments_subdivisions = [1, 4] if quick else [1, 4, 16]
+    populations = [1, 20] if quick else [1, 20, 80, 320]
+
+    with tempfile.TemporaryDirectory() as directory:
+        for subdivisions in segments_subdivisions:
+            points_file = POINTS_FILE if subdivisions == 1 else make_synthetic_track(
+                directory, subdivisions)
+            track = Track(points_file)
+            name = f'{len(track.segments)}_segments'
+
+            results[f'check_intersection/{name}'] = bench_check_intersection(
+                track)
+            results[f'car/{name}'] = bench_car(track)
+
+            for cars in populations:
+                results[f'intersect_segments/{name}/{cars}_cars'] = bench_intersect_segments(
+                    track, cars)
+                results[f'fleet/{name}/{cars}_cars'] = bench_fleet(
+                    track, cars)
+
+    for cars in populations:
+        results[f'predict/{cars}_cars'] = bench_predict(cars)
+
+    results['generation/80_cars'] = bench_generation(80)
+
+    return results
+
+
+def compare(results, baseline, tolerance):
+    # Times above the baseline by more than the tolerance are regressions
+    regressions = []
+
+    for name, metrics in results.items():
+        for metric, value in metrics.items():
+            if not metric.endswith('seconds') or metric not in baseline.get(name, {}):
+                continue
+
+            ratio = value / baseline[name][metric]
+            flag = ''
+
+            if ratio > 1 + tolerance:
+                flag = ' REGRESSION'
+                regressions.append(f'{name} {metric}')
+
+            print(f'{name} {metric}: {ratio:.2f}x baseline{flag}')
+
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Benchmark the hot paths of the simulator'
+    )
+    parser.add_argument('--quick', action='store_true',
+                        help='smaller tracks and populations')
+    parser.add_argument('--output', default=None,
+                        help='file to save the results to, as json')
+    parser.add_argument('--baseline', default=None,
+                        help='results of a previous run to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='slowdown over the baseline reported as a regression')
+
+    args = parser.parse_args()
+
+    results = run(quick=args.quick)
+
+    for name, metrics in results.items():
+        print(name, ', '.join(
+            f'{metric}: {value:.3g}' for metric, value in metrics.items()))
+
+    if args.output is not None:
+        with open(args.output, 'w') as file:
+            file.write(json.dumps(results, indent=4))
+
+    if args.baseline is not None:
+        with open(args.baseline, 'r') as file:
+            baseline = json.loads(file.read())
+
+        if len(compare(results, baseline, args.tolerance)) > 0:
+            sys.exit(1)
@@ -1,17 +1,50 @@
+import os
+import argparse
 import pygame
 from app.modules.game import Game
+from app.modules.profiler import Profiler
 
 
 WIDTH, HEIGHT = 1200, 800
 FPS = 60
 SCALE = 25
 
+parser = argparse.ArgumentParser(description='Train the cars in a window')
+parser.add_argument('--checkpoint', default=None, metavar='FILE',
+                    help='snapshot the population to this file every generation and on exit')
+parser.add_argument('--resume', action='store_true',
+                    help='continue from the --checkpoint file when it exists')
+parser.add_argument('--profile', default=None, metavar='FILE',
+                    help='show the stages timings and export them to this .csv or .json file on exit')
+parser.add_argument('--speed', type=float, default=1,
+                    help='simulated seconds per real second, + and - double and halve it')
+parser.add_argument('--steps-per-frame', type=int, default=None, metavar='STEPS',
+                    help='run this many steps per frame as fast as possible instead, f toggles it')
+parser.add_argument('--render-every', type=int, default=1, metavar='FRAMES',
+                    help='draw one frame out of this many, n cycles it')
+parser.add_argument('--best-only', action='store_true',
+                    help='draw only the best car alive, b toggles it')
+parser.add_argument('--no-rays', action='store_true',
+                    help="don't draw the sensors rays, r toggles them")
+args = parser.parse_args()
+
 pygame.init()
 
 screen = pygame.display.set_mode((WIDTH, HEIGHT))
 clock = pygame.time.Clock()
 
-game = Game(screen, SCALE)
+profiler = Profiler(keep_history=True) if args.profile is not None else None
+
+game = Game(screen, SCALE, checkpoint_file=args.checkpoint, profiler=profiler)
+
+game.speed = args.speed
+game.steps_per_frame = args.steps_per_frame
+game.render_every = args.render_every
+game.render_best_only = args.best_only
+game.render_rays = not args.no_rays
+
+if args.resume and args.checkpoint is not None and os.path.exists(args.checkpoint):
+    game.load_checkpoint(args.checkpoint)
 
 running = True
 
@@ -24,13 +57,23 @@ while running:
 
         game.update_inputs(event)
 
-    screen.fill((0, 0, 0))
-
     game.update(delta_time)
 
-    pygame.display.flip()
+    if game.should_render():
+        screen.fill((0, 0, 0))
+
+        game.render()
+
+        pygame.display.flip()
+
+    # the frames aren't capped when stepping as fast as possible
+    clock.tick(FPS if game.steps_per_frame is None else 0)
 
-    clock.tick(FPS)
+# the running generation starts over from its genomes on resume
+if args.checkpoint is not None:
+    game.save_checkpoint(args.checkpoint)
 
+if profiler is not None:
+    profiler.export(args.profile)
 
 pygame.quit()
@@ -0,0 +1,50 @@
+import os
+import argparse
+import numpy as np
+from app.modules.track_generator import TrackGenerator
+
+
+parser = argparse.ArgumentParser(
+    description='Generate random tracks in the path.json format'
+)
+parser.add_argument('--count', type=int, default=10,
+                    help='number of tracks for every number of segments')
+parser.add_argument('--output', default='tracks',
+                    help='directory the tracks are written to')
+parser.add_argument('--segments', type=int, nargs='+', default=[64],
+                    help='vertices of each wall, several values give tracks of growing complexity')
+parser.add_argument('--harmonics', type=int, default=8,
+                    help='waves of the track around a circle, the more the twistier')
+parser.add_argument('--amplitude', type=float, default=.8,
+                    help='depth of the waves')
+parser.add_argument('--track-width', type=float, default=120,
+                    help='width of the track in pixels')
+parser.add_argument('--check-points', type=int, default=12,
+                    help='checkpoints along the track')
+parser.add_argument('--size', type=int, nargs=2, default=[1200, 800], metavar=('WIDTH', 'HEIGHT'),
+                    help='screen the tracks fit in')
+parser.add_argument('--seed', type=int, default=None,
+                    help='seed of the random generator, for reproducible tracks')
+args = parser.parse_args()
+
+os.makedirs(args.output, exist_ok=True)
+
+rng = np.random.default_rng(args.seed)
+
+for segments in args.segments:
+    generator = TrackGenerator(
+        width=args.size[0],
+        height=args.size[1],
+        harmonics=args.harmonics,
+        amplitude=args.amplitude,
+        segments=segments,
+        track_width=args.track_width,
+        check_points=args.check_points,
+        rng=rng
+    )
+
+    for i in range(args.count):
+        generator.save(os.path.join(
+            args.output, f'track_{segments}_{i:04d}.json'))
+
+    print(f'{args.count} tracks of {segments} segments written to {args.output}')
@@ -0,0 +1,62 @@
+import argparse
+import pygame
+from app.modules.track import Track
+from app.modules.replay import Replay
+
+
+WIDTH, HEIGHT = 1200, 800
+FPS = 60
+SCALE = 25
+
+parser = argparse.ArgumentParser(
+    description='Watch the champions of training runs drive, without training'
+)
+parser.add_argument('checkpoints', nargs='+', metavar='FILE',
+                    help='snapshots saved by main.py or train.py --checkpoint')
+parser.add_argument('--population', action='store_true',
+                    help='replay every genome of the snapshots instead of their best one')
+parser.add_argument('--manual', action='store_true',
+                    help='drive a car with the arrows next to the champions')
+parser.add_argument('--track', default=None, metavar='FILE',
+                    help='track to drive on, the first one of the training run by default')
+parser.add_argument('--engine', choices=['segments', 'field'], default=None,
+                    help='walls intersection or sampling of the track distance field, the one of the training run by default')
+args = parser.parse_args()
+
+pygame.init()
+
+screen = pygame.display.set_mode((WIDTH, HEIGHT))
+clock = pygame.time.Clock()
+
+replay = Replay.from_checkpoints(
+    screen,
+    args.checkpoints,
+    population=args.population,
+    scale=SCALE,
+    track=Track(args.track) if args.track is not None else None,
+    engine=args.engine,
+    manual=args.manual
+)
+
+running = True
+
+while running:
+    delta_time = clock.get_time() / 1000
+
+    for event in pygame.event.get():
+        if event.type == pygame.QUIT:
+            running = False
+
+        replay.update_inputs(event)
+
+    screen.fill((0, 0, 0))
+
+    replay.update(delta_time)
+    replay.render()
+
+    pygame.display.flip()
+
+    clock.tick(FPS)
+
+
+pygame.quit()
@@ -0,0 +1,39 @@
+import os
+import numpy as np
+import pytest
+from app.modules.fleet import Fleet
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+POINTS_FILE = os.path.join(ROOT, 'path.json')
+
+NETWORK_OPTIONS = {
+    'inputs': 7,
+    'outputs': 2,
+    'hidden_layers': 2,
+    'hidden_neurons': 7
+}
+
+
+@pytest.fixture
+def centerline_driver(monkeypatch):
+    # replaces the physics of every fleet by a drive along the given
+    # closed centerline, speed pixels per step, whatever the networks say
+    def drive(centerline, speed=5):
+        centerline = np.asarray(centerline, dtype=float)
+        closed = np.vstack([centerline, centerline[:1]])
+        lengths = np.concatenate(
+            [[0], np.cumsum(np.linalg.norm(np.diff(closed, axis=0), axis=1))])
+
+        def do_physics(fleet, cars, delta_time, outputs):
+            traveled = (fleet.steps * speed) % lengths[-1]
+            index = np.searchsorted(lengths, traveled, side='right') - 1
+            direction = closed[index + 1] - closed[index]
+            t = (traveled - lengths[index]) / np.linalg.norm(direction)
+
+            fleet.positions[cars] = (closed[index] + t * direction) / fleet.scale
+            fleet.angles[cars] = np.arctan2(-direction[1], direction[0])
+
+        monkeypatch.setattr(Fleet, '_do_physics', do_physics)
+
+    return drive
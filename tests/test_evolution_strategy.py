@@ -0,0 +1,63 @@
+import io
+import numpy as np
+from app.modules.evolution_strategy import EvolutionStrategy
+
+
+def _fitness(genomes):
+    return -np.sum((genomes - .3) ** 2, axis=1)
+
+
+def _save_and_load(state):
+    # through the same file format as the checkpoints
+    file = io.BytesIO()
+    np.savez(file, **state)
+    file.seek(0)
+
+    with np.load(file) as arrays:
+        return {name: arrays[name] for name in arrays.files}
+
+
+def test_state_round_trip_resumes_the_same_generations():
+    strategy = EvolutionStrategy(.5, rng=np.random.default_rng(0))
+    genomes = np.random.default_rng(1).uniform(-1, 1, (12, 5))
+
+    for i in range(3):
+        genomes, parents = strategy.next_generation(genomes, _fitness(genomes))
+
+    resumed = EvolutionStrategy(.5, rng=np.random.default_rng(2))
+    resumed.set_state(_save_and_load(strategy.get_state()))
+
+    for i in range(3):
+        expected, parents = strategy.next_generation(genomes, _fitness(genomes))
+        resumed_genomes, parents = resumed.next_generation(genomes, _fitness(genomes))
+
+        assert (resumed_genomes == expected).all()
+        assert (parents == -1).all()
+
+        genomes = expected
+
+    assert resumed.sigma == strategy.sigma
+    assert resumed.generation == strategy.generation
+
+
+def test_state_before_the_first_generation_only_holds_the_generator():
+    strategy = EvolutionStrategy(.5, rng=np.random.default_rng(0))
+    state = _save_and_load(strategy.get_state())
+
+    assert list(state) == ['rng_state']
+
+    resumed = EvolutionStrategy(.5, rng=np.random.default_rng(1))
+    resumed.set_state(state)
+
+    assert resumed.mean is None
+    assert resumed.rng.random() == strategy.rng.random()
+
+
+def test_converges_on_a_sphere():
+    strategy = EvolutionStrategy(.5, rng=np.random.default_rng(0))
+    genomes = np.random.default_rng(1).uniform(-1, 1, (16, 4))
+
+    for i in range(60):
+        genomes, parents = strategy.next_generation(genomes, _fitness(genomes))
+
+    assert np.allclose(strategy.mean, .3, atol=.05)
@@ -0,0 +1,59 @@
+import numpy as np
+from app.modules.fitness_cache import FitnessCache
+
+
+CONTEXT = b'context'
+
+
+def _get_genomes(number, seed=0):
+    return np.random.default_rng(seed).uniform(-1, 1, (number, 6))
+
+
+def test_lookup_finds_the_stored_fitness_in_their_context():
+    cache = FitnessCache()
+    genomes = _get_genomes(4)
+
+    cache.store(genomes[:3], CONTEXT, [1, 2, 3])
+
+    fitness, found = cache.lookup(genomes, CONTEXT)
+
+    assert (found == [True, True, True, False]).all()
+    assert (fitness[:3] == [1, 2, 3]).all()
+    assert (cache.hits, cache.misses) == (3, 1)
+
+    fitness, found = cache.lookup(genomes, b'other context')
+
+    assert not found.any()
+
+
+def test_the_least_recently_used_fitness_are_dropped():
+    cache = FitnessCache(max_size=3)
+    genomes = _get_genomes(4)
+
+    cache.store(genomes[:3], CONTEXT, [1, 2, 3])
+    # the first genome is used again, the second one is now the oldest
+    cache.lookup(genomes[:1], CONTEXT)
+    cache.store(genomes[3:], CONTEXT, [4])
+
+    fitness, found = cache.lookup(genomes, CONTEXT)
+
+    assert (found == [True, False, True, True]).all()
+    assert len(cache.entries) == 3
+
+
+def test_save_and_load_keep_the_order_of_use(tmp_path):
+    cache_file = str(tmp_path / 'cache' / 'fitness.npz')
+    genomes = _get_genomes(4)
+
+    cache = FitnessCache(cache_file=cache_file)
+    cache.store(genomes, CONTEXT, [1, 2, 3, 4])
+    cache.lookup(genomes[:1], CONTEXT)
+    cache.save()
+
+    # smaller, the least recently used are dropped while loading
+    loaded = FitnessCache(max_size=2, cache_file=cache_file)
+
+    fitness, found = loaded.lookup(genomes, CONTEXT)
+
+    assert (found == [True, False, False, True]).all()
+    assert (fitness[[0, 3]] == [1, 4]).all()
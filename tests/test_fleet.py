@@ -0,0 +1,87 @@
+import numpy as np
+from app.modules.fleet import Fleet
+from app.modules.game import Game
+from app.modules.track import Track
+from app.modules.neural_network import get_parameters_number
+from conftest import POINTS_FILE, NETWORK_OPTIONS
+
+
+def _get_fleet(tmp_path, size=8, **options):
+    genomes = np.random.default_rng(0).uniform(
+        -1, 1, (size, get_parameters_number(**NETWORK_OPTIONS)))
+
+    return Fleet(Track(POINTS_FILE, cache_directory=str(tmp_path)),
+                 genomes, NETWORK_OPTIONS, scale=25, **options)
+
+
+def test_substeps_only_split_the_physics(tmp_path, monkeypatch):
+    calls = {'_shoot_rays': 0, '_predict': 0, '_do_physics': 0}
+
+    for name in calls:
+        method = getattr(Fleet, name)
+
+        def counted(fleet, *args, name=name, method=method):
+            calls[name] += 1
+            return method(fleet, *args)
+
+        monkeypatch.setattr(Fleet, name, counted)
+
+    fleet = _get_fleet(tmp_path, substeps=4)
+    fleet.step(1 / 60)
+
+    assert calls == {'_shoot_rays': 1, '_predict': 1, '_do_physics': 4}
+    assert fleet.steps == 1 and fleet.time == 1 / 60
+
+
+def test_substeps_move_the_cars_like_a_smaller_timestep(tmp_path):
+    fleet = _get_fleet(tmp_path, substeps=4)
+    fleet.step(1 / 15)
+
+    reference = _get_fleet(tmp_path)
+    cars = np.arange(reference.size)
+    reference.distances[cars] = reference._shoot_rays(cars)
+    outputs = reference._predict(cars)
+
+    for i in range(4):
+        reference._do_physics(cars, 1 / 60, outputs)
+
+    alive = fleet.alive
+    assert np.allclose(fleet.positions[alive], reference.positions[alive])
+    assert np.allclose(fleet.angles[alive], reference.angles[alive])
+
+
+def test_lapping_cars_end_the_generation(tmp_path, centerline_driver, monkeypatch):
+    track = Track(POINTS_FILE, cache_directory=str(tmp_path))
+    centerline_driver(track.centerline)
+
+    # the centerline of the hand drawn track cuts a few corners
+    monkeypatch.setattr(Fleet, '_check_wall_collisions',
+                        lambda fleet, cars, *args: np.zeros(len(cars), dtype=bool))
+
+    game = Game(scale=25, cars_per_generation=4, seed=0, tracks=[track], max_steps=None)
+    fleet = Fleet(track, game.genomes, NETWORK_OPTIONS, scale=25, game=game, laps=2, max_steps=None)
+
+    while fleet.alive.any():
+        fleet.step(1 / 60)
+
+        assert fleet.steps < 2000
+
+    assert game.removed_count == {'finished': 4}
+    assert (fleet.check_point_indices == 2 * len(track.check_points_segments)).all()
+    assert (fleet.traveled_distances > track.length / 25).all()
+
+
+def test_the_fleet_retires_after_max_steps(tmp_path, centerline_driver):
+    track = Track(POINTS_FILE, cache_directory=str(tmp_path))
+    # parked on the start line, far from timing out
+    centerline_driver(track.centerline, speed=0)
+
+    game = Game(scale=25, cars_per_generation=4, seed=0, tracks=[track], max_steps=50)
+
+    removed = []
+    game.remove = lambda index, reason: removed.append((game.fleet.steps, reason))
+
+    game.run_generation()
+
+    assert game.current_generation == 2
+    assert removed == [(50, 'out of steps')] * 4
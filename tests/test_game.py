@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+from app.modules.game import Game
+from app.modules.track import Track
+from app.modules.evolution_strategy import EvolutionStrategy
+from conftest import POINTS_FILE
+
+
+def test_resuming_with_another_optimizer_fails(tmp_path):
+    checkpoint_file = str(tmp_path / 'checkpoint.npz')
+    track = Track(POINTS_FILE, cache_directory=str(tmp_path))
+
+    Game(cars_per_generation=4, seed=0, tracks=[track]).save_checkpoint(checkpoint_file)
+
+    game = Game(cars_per_generation=4, seed=0, tracks=[track],
+                optimizer=EvolutionStrategy(.5, rng=np.random.default_rng(0)))
+    genomes = game.genomes.copy()
+
+    with pytest.raises(ValueError, match='GeneticAlgorithm'):
+        game.load_checkpoint(checkpoint_file)
+
+    assert (game.genomes == genomes).all()
+
+
+@pytest.mark.parametrize('strategy', [False, True])
+def test_resumed_run_breeds_the_same_generations(tmp_path, strategy):
+    checkpoint_file = str(tmp_path / 'checkpoint.npz')
+    track = Track(POINTS_FILE, cache_directory=str(tmp_path))
+
+    def get_game():
+        optimizer = EvolutionStrategy(.5, rng=np.random.default_rng([0, 1])) if strategy else None
+
+        return Game(scale=25, cars_per_generation=6, seed=0, tracks=[track],
+                    optimizer=optimizer, max_steps=100)
+
+    game = get_game()
+    game.run_generation()
+    game.save_checkpoint(checkpoint_file)
+
+    resumed = get_game()
+    resumed.load_checkpoint(checkpoint_file)
+
+    assert resumed.current_generation == game.current_generation == 2
+
+    for i in range(2):
+        game.run_generation()
+        resumed.run_generation()
+
+        assert (resumed.genomes == game.genomes).all()
+        assert resumed.best_fitness == game.best_fitness
+
+    assert game.best_fitness > 0
+    assert (resumed.best_genome == game.best_genome).all()
+
+
+def test_resuming_with_other_network_options_fails(tmp_path):
+    checkpoint_file = str(tmp_path / 'checkpoint.npz')
+    track = Track(POINTS_FILE, cache_directory=str(tmp_path))
+
+    game = Game(cars_per_generation=4, seed=0, tracks=[track])
+    game.save_checkpoint(checkpoint_file)
+
+    game.network_options = dict(game.network_options, hidden_neurons=3)
+
+    with pytest.raises(ValueError, match='network options'):
+        game.load_checkpoint(checkpoint_file)
@@ -0,0 +1,70 @@
+import numpy as np
+from app.modules.genetic_algorithm import GeneticAlgorithm
+
+
+def _get_parents(size=6, genes=10):
+    rng = np.random.default_rng(0)
+
+    return rng.uniform(-1, 1, (size, genes)), rng.uniform(-1, 1, (size, genes))
+
+
+def test_split_crossover_swaps_the_masked_genes():
+    split_mask = np.arange(10) < 4
+    parents_1, parents_2 = _get_parents()
+
+    children_1, children_2 = GeneticAlgorithm(split_mask).crossover(parents_1, parents_2)
+
+    assert (children_1[:, :4] == parents_1[:, :4]).all()
+    assert (children_1[:, 4:] == parents_2[:, 4:]).all()
+    assert (children_2[:, :4] == parents_2[:, :4]).all()
+    assert (children_2[:, 4:] == parents_1[:, 4:]).all()
+
+
+def test_uniform_crossover_shares_every_gene_between_the_children():
+    parents_1, parents_2 = _get_parents()
+
+    children_1, children_2 = GeneticAlgorithm(
+        None, crossover='uniform', rng=np.random.default_rng(0)).crossover(parents_1, parents_2)
+
+    from_first = children_1 == parents_1
+
+    assert (np.where(from_first, children_2, children_1) == parents_2).all()
+    assert (np.where(from_first, children_1, children_2) == parents_1).all()
+    assert 0 < from_first.mean() < 1
+
+
+def test_uniform_mutation_replaces_genes_in_range():
+    genomes = np.full((50, 20), 5.0)
+
+    GeneticAlgorithm(None, mutation_rate=.3, rng=np.random.default_rng(0)).mutate(genomes)
+
+    mutated = genomes != 5
+
+    assert .2 < mutated.mean() < .4
+    assert (np.abs(genomes[mutated]) <= 1).all()
+
+
+def test_gaussian_mutation_adds_noise_of_the_mutation_scale():
+    genomes = np.zeros((200, 50))
+
+    GeneticAlgorithm(None, mutation_rate=1, mutation='gaussian', mutation_scale=.1,
+                     rng=np.random.default_rng(0)).mutate(genomes)
+
+    assert abs(genomes.std() - .1) < .01
+
+
+def test_next_generation_keeps_the_elites_and_fills_with_newcomers():
+    genomes, others = _get_parents(size=10)
+    fitness = np.arange(10.0)
+
+    algorithm = GeneticAlgorithm(
+        np.arange(10) < 5, number_to_cross_over=3, elitism=2, rng=np.random.default_rng(0))
+    next_genomes, parents = algorithm.next_generation(genomes, fitness)
+
+    assert next_genomes.shape == genomes.shape
+    assert (next_genomes[:2] == genomes[[9, 8]]).all()
+    assert (parents[:2] == [9, 8]).all()
+
+    # three couples of children then the random newcomers
+    assert ((parents[2:8] >= 0) & (parents[2:8] < 10)).all()
+    assert (parents[8:] == -1).all()
@@ -0,0 +1,47 @@
+import numpy as np
+from app.utils.math import intersect_segments, cast_rays
+
+
+def test_intersect_segments_returns_the_position_along_the_first_segment():
+    assert intersect_segments(np.array([0, 0, 4, 0.]), np.array([1, -1, 1, 1.])) == .25
+
+    # parallel, apart and past the end
+    assert intersect_segments(np.array([0, 0, 4, 0.]), np.array([0, 1, 4, 1.])) == np.inf
+    assert intersect_segments(np.array([0, 0, 4, 0.]), np.array([5, -1, 5, 1.])) == np.inf
+
+
+def test_intersect_segments_broadcasts():
+    segments_1 = np.array([[0, 0, 4, 0], [0, 2, 4, 2.]])
+    segments_2 = np.array([[1, -1, 1, 3], [3, -1, 3, 1.], [0, 5, 4, 5.]])
+
+    hits = intersect_segments(segments_1[:, np.newaxis], segments_2)
+
+    assert hits.shape == (2, 3)
+    assert np.allclose(hits, [[.25, .75, np.inf], [.25, np.inf, np.inf]])
+
+
+def test_cast_rays_returns_the_distance_to_the_nearest_wall():
+    walls = np.array([[5, -1, 5, 1], [3, -1, 3, 1], [-2, -1, -2, 1.]])
+
+    distances = cast_rays(
+        np.zeros((3, 2)),
+        np.array([[10, 0], [-10, 0], [0, 10.]]),
+        walls
+    )
+
+    assert np.allclose(distances, [3, 2, np.inf])
+
+
+def test_cast_rays_of_every_car_against_its_own_segments():
+    # (N, R) rays against (N, 1, S, 4) segments, like Fleet._shoot_rays
+    origins = np.array([[[0, 0.]], [[10, 0.]]])
+    directions = np.array([[1, 0.], [0, 1.]]) * 10
+    segments = np.array([
+        [[[4, -1, 4, 1], [-1, 6, 1, 6.]]],
+        [[[7, -5, 13, -5], [9, 2, 11, 2.]]]
+    ])
+
+    distances = cast_rays(origins, directions, segments)
+
+    assert distances.shape == (2, 2)
+    assert np.allclose(distances, [[4, 6], [np.inf, 2]])
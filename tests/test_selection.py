@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+from app.modules.selection import RouletteSelection, RankSelection, TournamentSelection
+
+
+@pytest.mark.parametrize('selection', [RouletteSelection(), RankSelection(), TournamentSelection()])
+def test_couples_have_two_different_parents(selection):
+    fitness = np.random.default_rng(0).uniform(0, 10, 20)
+
+    first, second = selection.select(fitness, 1000, np.random.default_rng(1))
+
+    assert len(first) == len(second) == 1000
+    assert ((first >= 0) & (first < 20) & (second >= 0) & (second < 20)).all()
+    assert (first != second).all()
+
+
+def test_roulette_skips_the_genomes_without_fitness():
+    first, second = RouletteSelection().select(
+        np.array([0, -3, 5, 5]), 1000, np.random.default_rng(0))
+
+    assert set(first) | set(second) == {2, 3}
+
+
+def test_roulette_picks_another_parent_when_one_holds_all_the_weight():
+    first, second = RouletteSelection().select(
+        np.array([0, 0, 7, 0]), 100, np.random.default_rng(0))
+
+    assert (first == 2).all() and (second != 2).all()
+
+
+def test_rank_favors_the_best_genomes():
+    fitness = np.arange(10) * 1000.0
+    fitness[-1] = 1e9
+
+    first, second = RankSelection().select(fitness, 10000, np.random.default_rng(0))
+    counts = np.bincount(np.concatenate([first, second]), minlength=10)
+
+    # weights of 1 to 10 whatever the fitness scale
+    assert (np.diff(counts) > 0).all()
+    assert counts[-1] < 6 * counts[1]
+
+
+def test_tournament_of_the_whole_population_picks_the_two_best():
+    fitness = np.array([3, 9, 1, 7])
+
+    first, second = TournamentSelection(size=200).select(
+        fitness, 50, np.random.default_rng(0))
+
+    assert (first == 1).all() and (second == 3).all()
@@ -0,0 +1,68 @@
+import numpy as np
+from app.modules.spatial_grid import SpatialGrid
+from app.utils.math import intersect_segments
+
+
+def _get_segments(number=300, seed=0):
+    rng = np.random.default_rng(seed)
+    starts = rng.uniform(0, 1000, (number, 2))
+
+    return np.concatenate([starts, starts + rng.uniform(-80, 80, (number, 2))], axis=1)
+
+
+def test_segments_near_holds_every_segment_in_the_box():
+    segments = _get_segments()
+    grid = SpatialGrid(segments, cell_size=100)
+
+    min_point, max_point = np.array([220, 410]), np.array([530, 600])
+    found = set(grid.segments_near(min_point, max_point))
+
+    # the bounding box of the segment overlaps the queried one
+    overlapping = (
+        (np.minimum(segments[:, :2], segments[:, 2:]) <= max_point).all(axis=1) &
+        (np.maximum(segments[:, :2], segments[:, 2:]) >= min_point).all(axis=1)
+    )
+
+    assert set(np.flatnonzero(overlapping)) <= found
+    assert len(found) < len(segments)
+
+
+def test_segments_along_ray_holds_every_segment_it_hits():
+    segments = _get_segments()
+    grid = SpatialGrid(segments, cell_size=100)
+
+    for start, end in [([10, 20], [900, 700]), ([500, 500], [500, 40]), ([990, 10], [5, 980])]:
+        ray = np.array([*start, *end], dtype=float)
+        hit = np.isfinite(intersect_segments(ray, segments))
+
+        assert set(np.flatnonzero(hit)) <= set(grid.segments_along_ray(start, end))
+
+
+def test_segments_around_holds_every_segment_in_the_radius_padded_with_nan():
+    segments = _get_segments()
+    grid = SpatialGrid(segments, cell_size=100)
+
+    centers = np.array([[100, 100], [512, 640], [5000, 5000]])
+    around = grid.segments_around(centers, 60)
+
+    assert around.shape[:2] == (3, grid.get_candidates_number(60))
+
+    for center, candidates in zip(centers, around):
+        near = (np.abs(segments[:, :2] - center) <= 60).all(axis=1)
+
+        assert {tuple(segment) for segment in segments[near]} <= {
+            tuple(segment) for segment in candidates}
+
+    # outside of the grid
+    assert np.isnan(around[2]).all()
+
+
+def test_arrays_round_trip_answers_the_same_queries():
+    segments = _get_segments()
+    grid = SpatialGrid(segments, cell_size=100)
+
+    rebuilt = SpatialGrid.from_arrays(segments, **grid.to_arrays())
+
+    assert (rebuilt.segments_near([0, 0], [300, 300]) == grid.segments_near([0, 0], [300, 300])).all()
+    assert np.array_equal(rebuilt.segments_around(np.array([[400, 400]]), 120),
+                          grid.segments_around(np.array([[400, 400]]), 120), equal_nan=True)
@@ -0,0 +1,41 @@
+import os
+import shutil
+import numpy as np
+from app.modules.track import Track
+from conftest import POINTS_FILE
+
+
+def test_cache_key_follows_the_layout_and_the_compile_settings(tmp_path):
+    renamed_file = str(tmp_path / 'renamed.json')
+    shutil.copy(POINTS_FILE, renamed_file)
+
+    track = Track(POINTS_FILE, use_cache=False)
+
+    assert Track(renamed_file, use_cache=False).cache_key == track.cache_key
+
+    for options in [{'cell_size': 100}, {'progress_resolution': 8}, {'field_resolution': 2}]:
+        assert Track(POINTS_FILE, use_cache=False, **options).cache_key != track.cache_key
+
+
+def test_cached_track_is_the_compiled_one(tmp_path):
+    compiled = Track(POINTS_FILE, cache_directory=str(tmp_path))
+
+    assert os.listdir(tmp_path) == [f'{compiled.cache_key}.npz']
+
+    cached = Track(POINTS_FILE, cache_directory=str(tmp_path))
+
+    for name in ['segments', 'check_points_segments', 'centerline', 'centerline_lengths', 'progress_field']:
+        assert np.array_equal(getattr(cached, name), getattr(compiled, name))
+
+    assert cached.starting_point == compiled.starting_point
+    assert cached.length == compiled.length
+
+    points = np.random.default_rng(0).uniform(0, 1000, (50, 2))
+    assert np.array_equal(cached.get_progress(points), compiled.get_progress(points))
+    assert np.array_equal(cached.segments_around(points, 50), compiled.segments_around(points, 50), equal_nan=True)
+
+
+def test_uncached_track_writes_nothing(tmp_path):
+    Track(POINTS_FILE, cache_directory=str(tmp_path), use_cache=False)
+
+    assert os.listdir(tmp_path) == []
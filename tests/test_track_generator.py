@@ -0,0 +1,62 @@
+import numpy as np
+from app.modules.game import Game
+from app.modules.track import Track
+from app.modules.track_generator import TrackGenerator
+from app.utils.math import intersect_segments
+
+
+def test_generated_track_is_valid_and_starts_facing_x(tmp_path):
+    generator = TrackGenerator(segments=64, rng=np.random.default_rng(0))
+    points_data = generator.save(str(tmp_path / 'track.json'))
+
+    outer = np.array(points_data['outer_vertices'])
+    inner = np.array(points_data['inner_vertices'])
+
+    assert len(outer) == len(inner) == 64
+    assert len(points_data['check_points']) == generator.check_points
+
+    # the walls never cross each other
+    walls = [np.concatenate([wall, np.roll(wall, -1, axis=0)], axis=1)
+             for wall in (outer, inner)]
+    assert not np.isfinite(intersect_segments(
+        walls[0][:, np.newaxis], walls[1][np.newaxis])).any()
+
+    # inside the screen
+    assert (outer >= 0).all() and (outer[:, 0] <= 1200).all() and (outer[:, 1] <= 800).all()
+
+    # the start line is the last checkpoint, it ends the laps
+    start_line = np.array(points_data['check_points'][-1])
+    assert np.allclose(start_line.mean(axis=0), points_data['starting_point'], atol=.1)
+
+    # the second centerline point is on the +x side of the start
+    middles = (outer + inner) / 2
+    assert middles[1, 0] > middles[0, 0]
+
+
+def test_generated_track_lets_a_generation_finish(tmp_path, centerline_driver):
+    points_file = str(tmp_path / 'track.json')
+    points_data = TrackGenerator(
+        segments=64, rng=np.random.default_rng(5)).save(points_file)
+
+    # every car drives the centerline, lapping faster than the timeout
+    centerline_driver((np.array(points_data['outer_vertices']) +
+                       np.array(points_data['inner_vertices'])) / 2)
+
+    game = Game(
+        scale=25,
+        cars_per_generation=4,
+        seed=0,
+        tracks=[Track(points_file, cache_directory=str(tmp_path))],
+        max_steps=None
+    )
+
+    game.fleet.step(game.clock.delta_time)
+    assert game.fleet.alive.all()
+
+    while game.fleet.alive.any():
+        game.fleet.step(game.clock.delta_time)
+
+        assert game.fleet.steps < 5000
+
+    assert game.removed_count == {'finished': 4}
+    assert (game.tracks_fitness[0] > game.track.length / game.scale).all()
@@ -0,0 +1,175 @@
+import os
+import time
+import argparse
+import numpy as np
+from app.modules.game import Game
+from app.modules.track import Track
+from app.modules.fitness_cache import FitnessCache
+from app.modules.evolution_strategy import EvolutionStrategy
+from app.modules.profiler import Profiler
+from app.modules.evaluator import Evaluator
+from app.modules.selection import SELECTIONS
+from app.modules.simulation_clock import SimulationClock
+from app.modules.pruning import StalledVelocityPruning, MovingBackwardPruning, NoProgressPruning, BudgetPruning, BottomFractionPruning
+
+
+SCALE = 25
+POINTS_FILE = 'path.json'
+
+parser = argparse.ArgumentParser(
+    description='Train the cars without opening a window'
+)
+parser.add_argument('--generations', type=int, default=10,
+                    help='number of generations to train, resumed runs included')
+parser.add_argument('--checkpoint', default=None, metavar='FILE',
+                    help='snapshot the population to this file as it trains')
+parser.add_argument('--checkpoint-every', type=int, default=1, metavar='GENERATIONS',
+                    help='generations between two snapshots')
+parser.add_argument('--resume', action='store_true',
+                    help='continue from the --checkpoint file when it exists')
+parser.add_argument('--dt', type=float, default=1 / 60,
+                    help='fixed simulation timestep in seconds')
+parser.add_argument('--substeps', type=int, default=1,
+                    help='physics and collision steps per simulation timestep, the cars still sense and decide once per timestep')
+parser.add_argument('--prune-stalled', type=float, default=None, metavar='SECONDS',
+                    help='kill the cars slower than 0.5 for this long')
+parser.add_argument('--prune-backward', type=float, default=None, metavar='SECONDS',
+                    help='kill the cars moving away from their next checkpoint for this long')
+parser.add_argument('--prune-no-progress', type=float, default=None, metavar='SECONDS',
+                    help='kill the cars whose fitness did not improve for this long')
+parser.add_argument('--max-steps', type=int, default=None,
+                    help='simulation steps budget per generation')
+parser.add_argument('--max-seconds', type=float, default=None,
+                    help='wall-clock budget per generation')
+parser.add_argument('--prune-bottom', type=float, nargs=2, default=None, metavar=('STEPS', 'FRACTION'),
+                    help='kill the worst fraction of the cars after this many steps')
+parser.add_argument('--seed', type=int, default=None,
+                    help='seed of the random generator, for reproducible runs')
+parser.add_argument('--cars', type=int, default=80,
+                    help='number of cars per generation')
+parser.add_argument('--workers', type=int, default=0,
+                    help='worker processes evaluating the generations, 0 to evaluate in this process')
+parser.add_argument('--engine', choices=['segments', 'field'], default='segments',
+                    help='walls intersection or sampling of the track distance field')
+parser.add_argument('--profile', default=None, metavar='FILE',
+                    help='export the stages timings of every generation to this .csv or .json file')
+parser.add_argument('--tracks', nargs='+', default=[POINTS_FILE], metavar='FILE',
+                    help='tracks every genome drives on')
+parser.add_argument('--aggregate', choices=['mean', 'min'], default='mean',
+                    help='how the fitness of a genome on the tracks is combined')
+parser.add_argument('--elitism', type=int, default=None,
+                    help='best genomes kept untouched from one generation to the next, 0 by default')
+parser.add_argument('--memoize', action='store_true',
+                    help="don't simulate again the genomes already scored")
+parser.add_argument('--fitness-cache', default=None, metavar='FILE',
+                    help='memoize and keep the scores in this file across runs')
+parser.add_argument('--fitness-cache-size', type=int, default=100000,
+                    help='scores kept, the least recently used are dropped')
+parser.add_argument('--optimizer', choices=['genetic', 'cma-es'], default='genetic',
+                    help='how the next generation is bred')
+parser.add_argument('--sigma', type=float, default=.5,
+                    help='initial step size of cma-es')
+parser.add_argument('--selection', choices=SELECTIONS.keys(), default=None,
+                    help='how the parents of the next generation are picked, roulette by default')
+
+args = parser.parse_args()
+
+if args.optimizer == 'cma-es' and (args.elitism is not None or args.selection is not None):
+    parser.error('--elitism and --selection only apply to the genetic optimizer')
+
+pruning = []
+
+if args.prune_stalled is not None:
+    pruning.append(StalledVelocityPruning(duration=args.prune_stalled))
+
+if args.prune_backward is not None:
+    pruning.append(MovingBackwardPruning(duration=args.prune_backward))
+
+if args.prune_no_progress is not None:
+    pruning.append(NoProgressPruning(duration=args.prune_no_progress))
+
+if args.max_steps is not None or args.max_seconds is not None:
+    pruning.append(BudgetPruning(args.max_steps, args.max_seconds))
+
+if args.prune_bottom is not None:
+    pruning.append(BottomFractionPruning(
+        int(args.prune_bottom[0]), args.prune_bottom[1]))
+
+if args.workers > 0 and args.prune_bottom is not None:
+    parser.error('--prune-bottom ranks the whole population, it needs --workers 0')
+
+evaluator = None
+
+if args.workers > 0:
+    evaluator = Evaluator(args.tracks, workers=args.workers)
+
+profiler = Profiler(keep_history=True) if args.profile is not None else None
+
+fitness_cache = None
+
+if args.memoize or args.fitness_cache is not None:
+    fitness_cache = FitnessCache(
+        args.fitness_cache_size, cache_file=args.fitness_cache)
+
+optimizer = None
+
+if args.optimizer == 'cma-es':
+    # its own generator, seeded apart from the one of the game
+    seed = [args.seed, 1] if args.seed is not None else None
+
+    optimizer = EvolutionStrategy(args.sigma, rng=np.random.default_rng(seed))
+
+game = Game(
+    scale=SCALE,
+    cars_per_generation=args.cars,
+    evaluator=evaluator,
+    selection=SELECTIONS[args.selection or 'roulette'](),
+    clock=SimulationClock(args.dt, substeps=args.substeps),
+    seed=args.seed,
+    pruning=pruning,
+    engine=args.engine,
+    checkpoint_file=args.checkpoint,
+    checkpoint_every=args.checkpoint_every,
+    profiler=profiler,
+    tracks=[Track(points_file) for points_file in args.tracks],
+    aggregate=args.aggregate,
+    elitism=args.elitism or 0,
+    fitness_cache=fitness_cache,
+    optimizer=optimizer
+)
+
+if fitness_cache is not None and game.fitness_cache is None:
+    print('The pruning policies depend on the whole population, not memoizing')
+
+if args.resume and args.checkpoint is not None and os.path.exists(args.checkpoint):
+    game.load_checkpoint(args.checkpoint)
+
+    print(f'Resumed at generation {game.current_generation}')
+
+start_time = time.time()
+
+first_generation = game.current_generation
+
+while game.current_generation <= args.generations:
+    generation_start_time = time.time()
+    generation = game.current_generation
+
+    game.run_generation()
+
+    print(
+        f'Generation {generation} done in {time.time() - generation_start_time:.2f}s')
+
+print(f'Trained {game.current_generation - first_generation} generations in {time.time() - start_time:.2f}s')
+
+if profiler is not None:
+    profiler.export(args.profile)
+
+if game.fitness_cache is not None:
+    print(
+        f'Fitness cache: {game.fitness_cache.hits} hits, {game.fitness_cache.misses} misses')
+
+    if args.fitness_cache is not None:
+        game.fitness_cache.save()
+
+if evaluator is not None:
+    evaluator.close()